@@ -4,7 +4,7 @@ from django.contrib.auth import get_user_model
 from .models import Receipt
 from apps.restaurants.serializers import RestaurantSerializer
 from apps.restaurants.tasks import update_restaurant_info
-from apps.restaurants.models import Restaurant
+from apps.restaurants.models import STUB_PLACE_ID_PREFIX, Restaurant
 
 User = get_user_model()
 
@@ -88,7 +88,7 @@ class ReceiptSerializer(serializers.ModelSerializer):
                 # Generate a placeholder place_id (will be updated by Google Places if found)
                 import uuid
 
-                placeholder_place_id = f"stub_{uuid.uuid4().hex[:16]}"
+                placeholder_place_id = f"{STUB_PLACE_ID_PREFIX}{uuid.uuid4().hex[:16]}"
 
                 restaurant_instance = Restaurant.objects.create(
                     place_id=placeholder_place_id,
@@ -0,0 +1,49 @@
+"""
+Filter backends for the restaurants API.
+"""
+
+from rest_framework import filters
+
+
+class RestaurantFilter(filters.BaseFilterBackend):
+    """
+    Filter restaurants by the cuisine, name, rating_min and rating_max
+    query parameters.
+
+    Rating bounds that are not numbers are ignored.
+    """
+
+    # Query parameter -> lookup for the plain text filters
+    text_filters = {
+        "cuisine": "cuisines__name__icontains",
+        "name": "name__icontains",
+    }
+
+    # Query parameter -> lookup for the numeric rating bounds
+    rating_filters = {
+        "rating_min": "rating__gte",
+        "rating_max": "rating__lte",
+    }
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        lookups = {
+            lookup: params[param]
+            for param, lookup in self.text_filters.items()
+            if param in params
+        }
+        for param, lookup in self.rating_filters.items():
+            try:
+                lookups[lookup] = float(params[param])
+            except (KeyError, ValueError):
+                pass
+
+        if not lookups:
+            return queryset
+
+        queryset = queryset.filter(**lookups)
+        # A restaurant with several matching cuisines would otherwise be
+        # returned once per match
+        if "cuisine" in params:
+            queryset = queryset.distinct()
+        return queryset
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-15 22:45
+
+from django.db import migrations, models
+
+
+def mark_existing_stubs(apps, schema_editor):
+    Restaurant = apps.get_model("restaurants", "Restaurant")
+    Restaurant.objects.filter(place_id__startswith="stub_").update(is_stub=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("restaurants", "0004_userrestaurantvisit_usercuisinestat"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="restaurant",
+            name="is_stub",
+            field=models.BooleanField(
+                db_index=True,
+                default=False,
+                editable=False,
+                help_text="Whether place_id is a placeholder awaiting a Google Places match",
+            ),
+        ),
+        migrations.RunPython(mark_existing_stubs, migrations.RunPython.noop),
+    ]
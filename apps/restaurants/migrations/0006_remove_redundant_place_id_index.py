@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-15 23:07
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("restaurants", "0005_restaurant_is_stub"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="restaurant",
+            name="restaurant_place_id_idx",
+        ),
+    ]
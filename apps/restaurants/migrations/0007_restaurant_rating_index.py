@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-15 23:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("restaurants", "0006_remove_redundant_place_id_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="restaurant",
+            index=models.Index(fields=["rating"], name="restaurant_rating_idx"),
+        ),
+    ]
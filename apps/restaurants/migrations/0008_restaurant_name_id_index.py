@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-15 23:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("restaurants", "0007_restaurant_rating_index"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="restaurant",
+            name="restaurant_name_idx",
+        ),
+        migrations.AddIndex(
+            model_name="restaurant",
+            index=models.Index(fields=["name", "id"], name="restaurant_name_id_idx"),
+        ),
+    ]
@@ -21,6 +21,11 @@ class Cuisine(models.Model):
         return self.name
 
 
+# Prefix of the placeholder place_id given to restaurants not yet matched
+# to a Google Places entry
+STUB_PLACE_ID_PREFIX = "stub_"
+
+
 class Restaurant(models.Model):
     """Model representing a restaurant with Google Places integration."""
 
@@ -51,18 +56,37 @@ class Restaurant(models.Model):
         ],
         help_text="Average rating from Google Places (0.00-5.00)",
     )
+    is_stub = models.BooleanField(
+        default=False,
+        db_index=True,
+        editable=False,
+        help_text="Whether place_id is a placeholder awaiting a Google Places match",
+    )
     updated_at = models.DateTimeField(auto_now=True, help_text="Last updated timestamp")
 
     class Meta:
         ordering = ["name"]
+        # place_id lookups use the index behind its unique constraint
         indexes = [
-            models.Index(fields=["place_id"], name="restaurant_place_id_idx"),
-            models.Index(fields=["name"], name="restaurant_name_idx"),
+            # Also serves name lookups; id breaks ties for cursor pagination
+            models.Index(fields=["name", "id"], name="restaurant_name_id_idx"),
+            # Range scans for the rating_min/rating_max filters
+            models.Index(fields=["rating"], name="restaurant_rating_idx"),
         ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        """Keep is_stub in sync with the place_id prefix."""
+        self.is_stub = self.place_id.startswith(STUB_PLACE_ID_PREFIX)
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "place_id" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "is_stub"}
+
+        super().save(*args, **kwargs)
+
 
 class UserRestaurantVisit(models.Model):
     """Model tracking how many times a user has visited each restaurant."""
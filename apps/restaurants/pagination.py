@@ -0,0 +1,17 @@
+"""
+Pagination classes for the restaurants API.
+"""
+
+from rest_framework.pagination import CursorPagination
+
+
+class RestaurantCursorPagination(CursorPagination):
+    """
+    Cursor pagination for restaurant lists.
+
+    Each page continues from the last row of the previous one instead of
+    skipping an OFFSET of rows, so deep pages cost the same as the first.
+    The id tiebreaker keeps the order stable for restaurants sharing a name.
+    """
+
+    ordering = ("name", "id")
@@ -56,10 +56,10 @@ class RestaurantSerializer(serializers.ModelSerializer):
         """Update restaurant with cuisines."""
         cuisine_names = validated_data.pop("cuisine_names", None)
 
-        # Update basic fields
+        # Update basic fields, writing only those columns
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        instance.save()
+        instance.save(update_fields=[*validated_data, "updated_at"])
 
         # Handle cuisines if provided
         if cuisine_names is not None:
@@ -178,3 +178,17 @@ class AllRecommendationsSerializer(serializers.Serializer):
     cheap = RecommendationSerializer(many=True)
     cuisine_match = RecommendationSerializer(many=True)
     user_context = serializers.DictField(required=False)
+
+
+class RecommendationParamsSerializer(serializers.Serializer):
+    """Serializer validating the query parameters of recommendation requests."""
+
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+    radius = serializers.IntegerField(min_value=1, max_value=50000, default=2000)
+    search_limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+
+class AllRecommendationsParamsSerializer(RecommendationParamsSerializer):
+    """Query parameters of all-types requests, where limit applies per type."""
+
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
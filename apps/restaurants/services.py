@@ -1,13 +1,133 @@
+import functools
 import logging
-from typing import Dict, Optional
-from decimal import Decimal
+import threading
+import time
+from typing import Callable, Dict, Optional
 
 import googlemaps
 from django.conf import settings
+from django.core.cache import cache
 
 logger = logging.getLogger(__name__)
 
 
+class CircuitBreakerOpen(Exception):
+    """Raised when a call is rejected because the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Minimal circuit breaker for calls to an external API.
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    rejects calls with CircuitBreakerOpen for `reset_timeout` seconds. The
+    next call after that is let through as a trial: success closes the
+    breaker, failure opens it again.
+
+    `is_failure` decides which exceptions count as failures; any other
+    exception is re-raised and treated like a response, since it shows the
+    upstream answered.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: int = 60,
+        is_failure: Callable[[Exception], bool] = lambda exc: True,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.is_failure = is_failure
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Close the breaker and forget recorded failures."""
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        """Current breaker state."""
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def call(self, func: Callable, *args, **kwargs):
+        """
+        Call `func` through the breaker.
+
+        Raises:
+            CircuitBreakerOpen: if the breaker is open, or half-open with a
+                trial call already in flight
+        """
+        with self._lock:
+            state = self.state
+            if state == self.OPEN or (
+                state == self.HALF_OPEN and self._trial_in_flight
+            ):
+                raise CircuitBreakerOpen(f"{self.name} circuit breaker is open")
+            if state == self.HALF_OPEN:
+                self._trial_in_flight = True
+
+        try:
+            result = func(*args, **kwargs)
+        except Exception as exc:
+            if not self.is_failure(exc):
+                with self._lock:
+                    self.reset()
+                raise
+            with self._lock:
+                self._failures += 1
+                if self._trial_in_flight or self._failures >= self.failure_threshold:
+                    logger.warning(
+                        f"{self.name} circuit breaker opened after "
+                        f"{self._failures} consecutive failures"
+                    )
+                    self._opened_at = time.monotonic()
+                    self._trial_in_flight = False
+            raise
+
+        with self._lock:
+            self.reset()
+        return result
+
+
+def _is_upstream_failure(exc: Exception) -> bool:
+    """
+    Return whether a googlemaps error means Google Places is unhealthy.
+
+    Timeouts, transport errors, 5xx responses and rate limiting count;
+    errors about the request itself, such as NOT_FOUND, do not.
+    """
+    if isinstance(exc, googlemaps.exceptions.HTTPError):
+        return exc.status_code >= 500
+    if isinstance(
+        exc, (googlemaps.exceptions.Timeout, googlemaps.exceptions.TransportError)
+    ):
+        return True
+    return (
+        isinstance(exc, googlemaps.exceptions.ApiError)
+        and exc.status == "OVER_QUERY_LIMIT"
+    )
+
+
+# Shared by every GooglePlacesService in the process so an outage detected
+# by one caller makes the others fail fast
+places_circuit_breaker = CircuitBreaker(
+    "Google Places", is_failure=_is_upstream_failure
+)
+
+
 class GooglePlacesService:
     """Service for interacting with Google Places API."""
 
@@ -38,6 +158,10 @@ class GooglePlacesService:
             logger.warning(f"Failed to initialize Google Places client: {exc}")
             self.client = None
 
+    def _call_client(self, method_name: str, **kwargs):
+        """Call a googlemaps client method through the shared circuit breaker."""
+        return places_circuit_breaker.call(getattr(self.client, method_name), **kwargs)
+
     def fetch_restaurant_details(self, place_id: str) -> Optional[Dict]:
         """
         Fetch restaurant details from Google Places API.
@@ -64,16 +188,13 @@ class GooglePlacesService:
                 "type",
             ]
 
-            result = self.client.place(place_id=place_id, fields=fields)
+            result = self._call_client("place", place_id=place_id, fields=fields)
 
             if result.get("status") != "OK":
                 logger.error(f"Google Places API error: {result.get('status')}")
                 return None
 
-            logger.info("--------------------------------")
-            logger.info("RAW Result from Google Places API:")
-            logger.info(result)
-            logger.info("--------------------------------")
+            logger.debug("Raw result from Google Places API: %s", result)
 
             place_data = result.get("result", {})
 
@@ -98,15 +219,16 @@ class GooglePlacesService:
                 "longitude": (
                     float(location.get("lng", 0)) if location.get("lng") else None
                 ),
+                # Kept as a float; converted to Decimal when saved on the model
                 "rating": (
-                    Decimal(str(place_data.get("rating", 0)))
-                    if place_data.get("rating")
-                    else None
+                    float(place_data["rating"]) if place_data.get("rating") else None
                 ),
                 "cuisines": cuisines,
                 "business_status": place_data.get("business_status", "UNKNOWN"),
             }
 
+        except CircuitBreakerOpen:
+            raise
         except Exception as e:
             logger.error(f"Error fetching place details for {place_id}: {str(e)}")
             return None
@@ -127,7 +249,8 @@ class GooglePlacesService:
 
         try:
             # Use the Places API Find Place endpoint for robust text queries
-            result = self.client.find_place(
+            result = self._call_client(
+                "find_place",
                 input=text_query,
                 input_type="textquery",
                 fields=["place_id", "name", "formatted_address", "geometry"],
@@ -146,6 +269,8 @@ class GooglePlacesService:
                 or candidate.get("formatted_address"),
                 "geometry": candidate.get("geometry"),
             }
+        except CircuitBreakerOpen:
+            raise
         except Exception as e:
             logger.error(f"Error finding place from text '{text_query}': {str(e)}")
             return None
@@ -266,16 +391,112 @@ class GooglePlacesService:
             return []
 
         try:
-            results = self.client.places(
-                query=query, location=location, radius=5000  # 5km radius
+            results = self._call_client(
+                "places", query=query, location=location, radius=5000  # 5km radius
             )
 
             return results.get("results", [])
 
+        except CircuitBreakerOpen:
+            raise
         except Exception as e:
             logger.error(f"Error searching places: {str(e)}")
             return []
 
+    def _nearby_places(self, latitude: float, longitude: float, radius: int) -> Dict:
+        """
+        Return the raw nearby restaurant search around a point, cached briefly.
+
+        Every recommendation type filters the same search client-side, so one
+        cached response serves all of them, and repeat requests for a user's
+        frequent locations skip the HTTP round trip.
+        """
+        cache_key = f"google_places:nearby:{latitude}:{longitude}:{radius}"
+        results = cache.get(cache_key)
+        if results is None:
+            results = self._call_client(
+                "places_nearby",
+                location=(latitude, longitude),
+                radius=radius,
+                type="restaurant",
+            )
+            cache.set(cache_key, results, settings.GOOGLE_PLACES_NEARBY_CACHE_TTL)
+        return results
+
+    def _filter_nearby_restaurants(
+        self,
+        results: Dict,
+        min_rating: float = None,
+        max_price_level: int = None,
+        cuisine_types: list = None,
+        top_k_results: int = 20,
+    ) -> list:
+        """
+        Filter a raw nearby search and shape the matching places.
+
+        Args:
+            results: Raw places_nearby response
+            min_rating: Minimum rating filter
+            max_price_level: Maximum price level
+            cuisine_types: List of cuisine types to filter by
+            top_k_results: Number of top results to return
+
+        Returns:
+            List of restaurant results with details, highest rated first
+        """
+        restaurants = []
+
+        for place in results.get("results", []):
+            # Apply rating filter
+            if min_rating and place.get("rating", 0) < min_rating:
+                continue
+
+            # Apply price level filter
+            if (
+                max_price_level is not None
+                and place.get("price_level", 5) > max_price_level
+            ):
+                continue
+
+            # Apply cuisine type filter
+            if cuisine_types:
+                place_types = place.get("types", [])
+                place_cuisines = self._extract_cuisines_from_types(place_types)
+
+                # Check if any of the place's cuisines match our desired cuisines
+                cuisine_match = False
+                for place_cuisine in place_cuisines:
+                    for desired_cuisine in cuisine_types:
+                        if desired_cuisine.lower() in place_cuisine.lower():
+                            cuisine_match = True
+                            break
+                    if cuisine_match:
+                        break
+
+                if not cuisine_match:
+                    continue
+
+            # Extract restaurant details
+            restaurant_data = {
+                "place_id": place.get("place_id"),
+                "name": place.get("name"),
+                "rating": place.get("rating"),
+                "price_level": place.get("price_level"),
+                "vicinity": place.get("vicinity"),
+                "geometry": place.get("geometry"),
+                "types": place.get("types", []),
+                "cuisines": self._extract_cuisines_from_types(place.get("types", [])),
+                "photos": place.get("photos", []),
+                "business_status": place.get("business_status", "OPERATIONAL"),
+            }
+
+            restaurants.append(restaurant_data)
+
+        # Sort by rating descending by default
+        restaurants.sort(key=lambda x: x.get("rating", 0), reverse=True)
+
+        return restaurants[:top_k_results]  # Return top k results
+
     def search_nearby_restaurants(
         self,
         latitude: float,
@@ -306,65 +527,17 @@ class GooglePlacesService:
 
         try:
             # Search for restaurants near the location
-            results = self.client.places_nearby(
-                location=(latitude, longitude), radius=radius, type="restaurant"
+            results = self._nearby_places(latitude, longitude, radius)
+            return self._filter_nearby_restaurants(
+                results,
+                min_rating=min_rating,
+                max_price_level=max_price_level,
+                cuisine_types=cuisine_types,
+                top_k_results=top_k_results,
             )
 
-            restaurants = []
-
-            for place in results.get("results", []):
-                # Apply rating filter
-                if min_rating and place.get("rating", 0) < min_rating:
-                    continue
-
-                # Apply price level filter
-                if (
-                    max_price_level is not None
-                    and place.get("price_level", 5) > max_price_level
-                ):
-                    continue
-
-                # Apply cuisine type filter
-                if cuisine_types:
-                    place_types = place.get("types", [])
-                    place_cuisines = self._extract_cuisines_from_types(place_types)
-
-                    # Check if any of the place's cuisines match our desired cuisines
-                    cuisine_match = False
-                    for place_cuisine in place_cuisines:
-                        for desired_cuisine in cuisine_types:
-                            if desired_cuisine.lower() in place_cuisine.lower():
-                                cuisine_match = True
-                                break
-                        if cuisine_match:
-                            break
-
-                    if not cuisine_match:
-                        continue
-
-                # Extract restaurant details
-                restaurant_data = {
-                    "place_id": place.get("place_id"),
-                    "name": place.get("name"),
-                    "rating": place.get("rating"),
-                    "price_level": place.get("price_level"),
-                    "vicinity": place.get("vicinity"),
-                    "geometry": place.get("geometry"),
-                    "types": place.get("types", []),
-                    "cuisines": self._extract_cuisines_from_types(
-                        place.get("types", [])
-                    ),
-                    "photos": place.get("photos", []),
-                    "business_status": place.get("business_status", "OPERATIONAL"),
-                }
-
-                restaurants.append(restaurant_data)
-
-            # Sort by rating descending by default
-            restaurants.sort(key=lambda x: x.get("rating", 0), reverse=True)
-
-            return restaurants[:top_k_results]  # Return top k results
-
+        except CircuitBreakerOpen:
+            raise
         except Exception as e:
             logger.error(f"Error searching nearby restaurants: {str(e)}")
             return []
@@ -390,41 +563,99 @@ class GooglePlacesService:
         Returns:
             List of recommended restaurants
         """
+        return self.search_nearby_restaurants(
+            latitude=latitude,
+            longitude=longitude,
+            radius=radius,
+            top_k_results=top_k_results,
+            **self._recommendation_filters(recommendation_type, user_cuisines),
+        )
+
+    def get_recommendations_by_type_near_location(
+        self,
+        latitude: float,
+        longitude: float,
+        recommendation_types: list,
+        user_cuisines: list = None,
+        radius: int = 2000,
+        top_k_results: int = 20,
+    ) -> Dict[str, list]:
+        """
+        Get several types of restaurant recommendations near a location.
+
+        All types filter the same nearby search, so it is fetched once and
+        filtered per type instead of being requested once per type.
+
+        Args:
+            latitude: Latitude coordinate
+            longitude: Longitude coordinate
+            recommendation_types: Types of recommendation ('good', 'cheap', 'cuisine_match')
+            user_cuisines: List of user's preferred cuisines (for cuisine_match type)
+
+        Returns:
+            Dictionary mapping each type to its list of recommended restaurants
+        """
+        if not self.client:
+            logger.error("Google Places client not initialized")
+            return {
+                recommendation_type: [] for recommendation_type in recommendation_types
+            }
+
+        try:
+            results = self._nearby_places(latitude, longitude, radius)
+            return {
+                recommendation_type: self._filter_nearby_restaurants(
+                    results,
+                    top_k_results=top_k_results,
+                    **self._recommendation_filters(recommendation_type, user_cuisines),
+                )
+                for recommendation_type in recommendation_types
+            }
+
+        except CircuitBreakerOpen:
+            raise
+        except Exception as e:
+            logger.error(f"Error searching nearby restaurants: {str(e)}")
+            return {
+                recommendation_type: [] for recommendation_type in recommendation_types
+            }
+
+    def _recommendation_filters(
+        self, recommendation_type: str, user_cuisines: list = None
+    ) -> Dict:
+        """
+        Get the nearby search filters for a recommendation type.
+
+        Args:
+            recommendation_type: Type of recommendation ('good', 'cheap', 'cuisine_match')
+            user_cuisines: List of user's preferred cuisines (for cuisine_match type)
+
+        Returns:
+            Keyword arguments for _filter_nearby_restaurants
+        """
         if recommendation_type == "good":
             # Good restaurants: rating >= 4.0
-            return self.search_nearby_restaurants(
-                latitude=latitude,
-                longitude=longitude,
-                min_rating=4.0,
-                radius=radius,
-                top_k_results=top_k_results,
-            )
+            return {"min_rating": 4.0}
 
         elif recommendation_type == "cheap":
             # Cheap restaurants: price level <= 1 (free or inexpensive)
-            return self.search_nearby_restaurants(
-                latitude=latitude,
-                longitude=longitude,
-                max_price_level=1,
-                radius=radius,
-                top_k_results=top_k_results,
-            )
+            return {"max_price_level": 1}
 
         elif recommendation_type == "cuisine_match" and user_cuisines:
             # Restaurants matching user's preferred cuisines
-            return self.search_nearby_restaurants(
-                latitude=latitude,
-                longitude=longitude,
-                cuisine_types=user_cuisines,
-                radius=radius,
-                top_k_results=top_k_results,
-            )
+            return {"cuisine_types": user_cuisines}
 
-        else:
-            # Default: just return nearby restaurants
-            return self.search_nearby_restaurants(
-                latitude=latitude,
-                longitude=longitude,
-                radius=radius,
-                top_k_results=top_k_results,
-            )
+        # Default: just return nearby restaurants
+        return {}
+
+
+@functools.lru_cache(maxsize=1)
+def get_places_service() -> GooglePlacesService:
+    """
+    Return a GooglePlacesService shared by every caller in this process,
+    built on first use.
+
+    Tests patch this function, or call get_places_service.cache_clear(), to
+    swap the service.
+    """
+    return GooglePlacesService()
@@ -14,7 +14,17 @@ spec = importlib.util.spec_from_file_location("main_services", services_path)
 main_services = importlib.util.module_from_spec(spec)
 spec.loader.exec_module(main_services)
 
-# Import GooglePlacesService
+# Import GooglePlacesService, its circuit breaker and the shared instance
 GooglePlacesService = main_services.GooglePlacesService
+CircuitBreaker = main_services.CircuitBreaker
+CircuitBreakerOpen = main_services.CircuitBreakerOpen
+places_circuit_breaker = main_services.places_circuit_breaker
+get_places_service = main_services.get_places_service
 
-__all__ = ["GooglePlacesService"]
+__all__ = [
+    "GooglePlacesService",
+    "CircuitBreaker",
+    "CircuitBreakerOpen",
+    "places_circuit_breaker",
+    "get_places_service",
+]
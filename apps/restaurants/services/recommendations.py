@@ -3,18 +3,32 @@ Restaurant recommendation service.
 """
 
 import logging
-from typing import List, Dict, Any
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+from django.db.models import F
 from apps.restaurants.models import UserRestaurantVisit, UserCuisineStat
-from apps.restaurants.services import GooglePlacesService
+from apps.restaurants.services import get_places_service
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on concurrent Google Places requests per process
+MAX_PLACES_WORKERS = 10
+
+# Shared by every recommendation call. Its threads outlive a request, so
+# each keeps the thread-local cache connection it opened for cached Places
+# searches instead of opening a new one per request.
+_places_executor = ThreadPoolExecutor(
+    max_workers=MAX_PLACES_WORKERS, thread_name_prefix="google-places"
+)
+
 
 class RestaurantRecommendationService:
     """Service for generating personalized restaurant recommendations."""
 
     def __init__(self):
-        self.places_service = GooglePlacesService()
+        # Reuse one Places client per process instead of one per request
+        self.places_service = get_places_service()
 
     def get_user_frequent_locations(self, user, limit: int = 5) -> List[Dict]:
         """
@@ -27,28 +41,23 @@ class RestaurantRecommendationService:
         Returns:
             List of location dictionaries with lat/lng coordinates
         """
+        # Select only the columns the location dicts need, straight into dicts
         top_visits = (
             UserRestaurantVisit.objects.filter(
                 user=user,
                 restaurant__latitude__isnull=False,
                 restaurant__longitude__isnull=False,
             )
-            .select_related("restaurant")
-            .order_by("-visit_count")[:limit]
+            .order_by("-visit_count")
+            .values(
+                "visit_count",
+                restaurant_name=F("restaurant__name"),
+                latitude=F("restaurant__latitude"),
+                longitude=F("restaurant__longitude"),
+            )[:limit]
         )
 
-        locations = []
-        for visit in top_visits:
-            locations.append(
-                {
-                    "restaurant_name": visit.restaurant.name,
-                    "latitude": visit.restaurant.latitude,
-                    "longitude": visit.restaurant.longitude,
-                    "visit_count": visit.visit_count,
-                }
-            )
-
-        return locations
+        return list(top_visits)
 
     def get_user_top_cuisines(self, user, limit: int = 5) -> List[str]:
         """
@@ -63,11 +72,11 @@ class RestaurantRecommendationService:
         """
         top_cuisines = (
             UserCuisineStat.objects.filter(user=user)
-            .select_related("cuisine")
-            .order_by("-visit_count")[:limit]
+            .order_by("-visit_count")
+            .values_list("cuisine__name", flat=True)[:limit]
         )
 
-        return [stat.cuisine.name for stat in top_cuisines]
+        return list(top_cuisines)
 
     def get_good_restaurants_recommendations(
         self, user, limit: int = 20, radius: int = 2000, per_location_limit: int = 20
@@ -88,39 +97,12 @@ class RestaurantRecommendationService:
             logger.info(f"No frequent locations found for user {user.email}")
             return []
 
-        all_recommendations = []
-
-        for location in frequent_locations:
-            try:
-                recommendations = self.places_service.get_recommendations_near_location(
-                    latitude=location["latitude"],
-                    longitude=location["longitude"],
-                    recommendation_type="good",
-                    radius=radius,
-                    top_k_results=per_location_limit,
-                )
-
-                # Add context about the reference location
-                for rec in recommendations:
-                    rec["reference_location"] = {
-                        "restaurant_name": location["restaurant_name"],
-                        "visit_count": location["visit_count"],
-                    }
-                    rec["recommendation_type"] = "good"
-
-                all_recommendations.extend(recommendations)
-
-            except Exception as e:
-                logger.error(
-                    f"Error getting good restaurant recommendations near {location['restaurant_name']}: {str(e)}"
-                )
-                continue
+        all_recommendations = self._fetch_for_locations(
+            frequent_locations, "good", radius, per_location_limit
+        )
 
         # Remove duplicates and sort by rating
-        unique_recommendations = self._deduplicate_recommendations(all_recommendations)
-        unique_recommendations.sort(key=lambda x: x.get("rating", 0), reverse=True)
-
-        return unique_recommendations[:limit]
+        return self._rank_recommendations(all_recommendations, limit)
 
     def get_cheap_restaurants_recommendations(
         self, user, limit: int = 20, radius: int = 2000, per_location_limit: int = 20
@@ -141,39 +123,12 @@ class RestaurantRecommendationService:
             logger.info(f"No frequent locations found for user {user.email}")
             return []
 
-        all_recommendations = []
-
-        for location in frequent_locations:
-            try:
-                recommendations = self.places_service.get_recommendations_near_location(
-                    latitude=location["latitude"],
-                    longitude=location["longitude"],
-                    recommendation_type="cheap",
-                    radius=radius,
-                    top_k_results=per_location_limit,
-                )
-
-                # Add context about the reference location
-                for rec in recommendations:
-                    rec["reference_location"] = {
-                        "restaurant_name": location["restaurant_name"],
-                        "visit_count": location["visit_count"],
-                    }
-                    rec["recommendation_type"] = "cheap"
-
-                all_recommendations.extend(recommendations)
-
-            except Exception as e:
-                logger.error(
-                    f"Error getting cheap restaurant recommendations near {location['restaurant_name']}: {str(e)}"
-                )
-                continue
+        all_recommendations = self._fetch_for_locations(
+            frequent_locations, "cheap", radius, per_location_limit
+        )
 
         # Remove duplicates and sort by rating (even for cheap restaurants, prefer good ones)
-        unique_recommendations = self._deduplicate_recommendations(all_recommendations)
-        unique_recommendations.sort(key=lambda x: x.get("rating", 0), reverse=True)
-
-        return unique_recommendations[:limit]
+        return self._rank_recommendations(all_recommendations, limit)
 
     def get_cuisine_match_recommendations(
         self, user, limit: int = 20, radius: int = 2000, per_location_limit: int = 20
@@ -189,54 +144,246 @@ class RestaurantRecommendationService:
             List of restaurant recommendation dictionaries
         """
         frequent_locations = self.get_user_frequent_locations(user)
-        user_cuisines = self.get_user_top_cuisines(user)
 
         if not frequent_locations:
             logger.info(f"No frequent locations found for user {user.email}")
             return []
 
+        user_cuisines = self.get_user_top_cuisines(user)
         if not user_cuisines:
             logger.info(f"No cuisine preferences found for user {user.email}")
             return []
 
-        all_recommendations = []
+        all_recommendations = self._fetch_for_locations(
+            frequent_locations,
+            "cuisine_match",
+            radius,
+            per_location_limit,
+            user_cuisines=user_cuisines,
+        )
+
+        self._add_matched_cuisines(all_recommendations, user_cuisines)
+
+        # Remove duplicates and sort by rating
+        return self._rank_recommendations(all_recommendations, limit)
+
+    def _fetch_for_location(
+        self,
+        location: Dict,
+        recommendation_type: str,
+        radius: int,
+        per_location_limit: int,
+        user_cuisines: Optional[List[str]] = None,
+    ) -> List[Dict]:
+        """
+        Fetch recommendations near a single reference location.
+
+        Errors are logged and swallowed so one failing location does not
+        discard the results of the others.
+
+        Args:
+            location: Location dictionary from get_user_frequent_locations
+            recommendation_type: Type of recommendation ('good', 'cheap', 'cuisine_match')
+            radius: Search radius in meters
+            per_location_limit: Maximum number of results for this location
+            user_cuisines: User's preferred cuisines (for cuisine_match type)
+
+        Returns:
+            List of restaurant recommendation dictionaries
+        """
+        try:
+            recommendations = self.places_service.get_recommendations_near_location(
+                latitude=location["latitude"],
+                longitude=location["longitude"],
+                recommendation_type=recommendation_type,
+                user_cuisines=user_cuisines,
+                radius=radius,
+                top_k_results=per_location_limit,
+            )
+        except Exception as e:
+            logger.error(
+                f"Error getting {recommendation_type} recommendations near {location['restaurant_name']}: {str(e)}"
+            )
+            return []
+
+        # Add context about the reference location
+        for rec in recommendations:
+            rec["reference_location"] = {
+                "restaurant_name": location["restaurant_name"],
+                "visit_count": location["visit_count"],
+            }
+            rec["recommendation_type"] = recommendation_type
+
+        return recommendations
+
+    def _fetch_for_locations(
+        self,
+        locations: List[Dict],
+        recommendation_type: str,
+        radius: int,
+        per_location_limit: int,
+        user_cuisines: Optional[List[str]] = None,
+    ) -> List[Dict]:
+        """
+        Fetch recommendations near all reference locations concurrently.
+
+        The Places client spends its time waiting on HTTP, so the shared pool
+        overlaps the per-location requests. Results keep the order of
+        `locations`.
+
+        Args:
+            locations: Location dictionaries from get_user_frequent_locations
+            recommendation_type: Type of recommendation ('good', 'cheap', 'cuisine_match')
+            radius: Search radius in meters
+            per_location_limit: Maximum number of results per location
+            user_cuisines: User's preferred cuisines (for cuisine_match type)
+
+        Returns:
+            Flat list of restaurant recommendation dictionaries
+        """
+        results = _places_executor.map(
+            lambda location: self._fetch_for_location(
+                location,
+                recommendation_type,
+                radius,
+                per_location_limit,
+                user_cuisines=user_cuisines,
+            ),
+            locations,
+        )
+        return [rec for recommendations in results for rec in recommendations]
+
+    def _fetch_types_for_location(
+        self,
+        location: Dict,
+        recommendation_types: List[str],
+        radius: int,
+        per_location_limit: int,
+        user_cuisines: Optional[List[str]] = None,
+    ) -> Dict[str, List[Dict]]:
+        """
+        Fetch several types of recommendations near a single reference location.
+
+        The Places service filters one nearby search for every type. Errors
+        are logged and swallowed so one failing location does not discard
+        the results of the others.
 
-        for location in frequent_locations:
-            try:
-                recommendations = self.places_service.get_recommendations_near_location(
+        Args:
+            location: Location dictionary from get_user_frequent_locations
+            recommendation_types: Types of recommendation ('good', 'cheap', 'cuisine_match')
+            radius: Search radius in meters
+            per_location_limit: Maximum number of results per type for this location
+            user_cuisines: User's preferred cuisines (for cuisine_match type)
+
+        Returns:
+            Dictionary mapping each type to a list of recommendation dictionaries
+        """
+        try:
+            recommendations_by_type = (
+                self.places_service.get_recommendations_by_type_near_location(
                     latitude=location["latitude"],
                     longitude=location["longitude"],
-                    recommendation_type="cuisine_match",
+                    recommendation_types=recommendation_types,
                     user_cuisines=user_cuisines,
                     radius=radius,
                     top_k_results=per_location_limit,
                 )
+            )
+        except Exception as e:
+            logger.error(
+                f"Error getting recommendations near {location['restaurant_name']}: {str(e)}"
+            )
+            return {
+                recommendation_type: [] for recommendation_type in recommendation_types
+            }
+
+        # Add context about the reference location
+        for recommendation_type, recommendations in recommendations_by_type.items():
+            for rec in recommendations:
+                rec["reference_location"] = {
+                    "restaurant_name": location["restaurant_name"],
+                    "visit_count": location["visit_count"],
+                }
+                rec["recommendation_type"] = recommendation_type
+
+        return recommendations_by_type
+
+    def _fetch_for_types(
+        self,
+        locations: List[Dict],
+        recommendation_types: List[str],
+        radius: int,
+        per_location_limit: int,
+        user_cuisines: Optional[List[str]] = None,
+    ) -> Dict[str, List[Dict]]:
+        """
+        Fetch several types of recommendations near all reference locations.
+
+        Each location needs a single Places request for all types, and the
+        shared pool overlaps the per-location requests. Results for each
+        type keep the order of `locations`.
+
+        Args:
+            locations: Location dictionaries from get_user_frequent_locations
+            recommendation_types: Types of recommendation ('good', 'cheap', 'cuisine_match')
+            radius: Search radius in meters
+            per_location_limit: Maximum number of results per type and location
+            user_cuisines: User's preferred cuisines (for cuisine_match type)
+
+        Returns:
+            Dictionary mapping each type to a flat list of recommendation dictionaries
+        """
+        all_recommendations = {
+            recommendation_type: [] for recommendation_type in recommendation_types
+        }
 
-                # Add context about the reference location and matched cuisines
-                for rec in recommendations:
-                    rec["reference_location"] = {
-                        "restaurant_name": location["restaurant_name"],
-                        "visit_count": location["visit_count"],
-                    }
-                    rec["recommendation_type"] = "cuisine_match"
-                    rec["matched_cuisines"] = self._get_matching_cuisines(
-                        rec.get("cuisines", []), user_cuisines
-                    )
-
-                all_recommendations.extend(recommendations)
-
-            except Exception as e:
-                logger.error(
-                    f"Error getting cuisine-based recommendations near {location['restaurant_name']}: {str(e)}"
+        results = _places_executor.map(
+            lambda location: self._fetch_types_for_location(
+                location,
+                recommendation_types,
+                radius,
+                per_location_limit,
+                user_cuisines=user_cuisines,
+            ),
+            locations,
+        )
+        for recommendations_by_type in results:
+            for recommendation_type in recommendation_types:
+                all_recommendations[recommendation_type].extend(
+                    recommendations_by_type.get(recommendation_type, [])
                 )
-                continue
 
-        # Remove duplicates and sort by rating
-        unique_recommendations = self._deduplicate_recommendations(all_recommendations)
+        return all_recommendations
+
+    def _rank_recommendations(
+        self, recommendations: List[Dict], limit: int
+    ) -> List[Dict]:
+        """
+        Deduplicate recommendations and keep the best-rated ones.
+
+        Args:
+            recommendations: List of restaurant dictionaries
+            limit: Maximum number of recommendations to return
+
+        Returns:
+            Up to `limit` unique restaurant dictionaries, highest rated first
+        """
+        unique_recommendations = self._deduplicate_recommendations(recommendations)
         unique_recommendations.sort(key=lambda x: x.get("rating", 0), reverse=True)
 
         return unique_recommendations[:limit]
 
+    def _add_matched_cuisines(
+        self, recommendations: List[Dict], user_cuisines: List[str]
+    ) -> None:
+        """Add the cuisines each recommendation shares with the user."""
+        # Compile the user's cuisines once for all recommendations
+        pattern = self._compile_cuisine_pattern(user_cuisines)
+        for rec in recommendations:
+            rec["matched_cuisines"] = self._match_cuisines(
+                rec.get("cuisines", []), pattern
+            )
+
     def _deduplicate_recommendations(self, recommendations: List[Dict]) -> List[Dict]:
         """
         Remove duplicate restaurants from recommendations list.
@@ -247,16 +394,15 @@ class RestaurantRecommendationService:
         Returns:
             List of unique restaurant dictionaries
         """
-        seen_place_ids = set()
-        unique_recommendations = []
+        # Dicts preserve insertion order; setdefault keeps the first occurrence
+        unique_recommendations = {}
 
         for rec in recommendations:
             place_id = rec.get("place_id")
-            if place_id and place_id not in seen_place_ids:
-                seen_place_ids.add(place_id)
-                unique_recommendations.append(rec)
+            if place_id:
+                unique_recommendations.setdefault(place_id, rec)
 
-        return unique_recommendations
+        return list(unique_recommendations.values())
 
     def _get_matching_cuisines(
         self, restaurant_cuisines: List[str], user_cuisines: List[str]
@@ -271,15 +417,51 @@ class RestaurantRecommendationService:
         Returns:
             List of matching cuisine names
         """
-        matching = []
+        return self._match_cuisines(
+            restaurant_cuisines, self._compile_cuisine_pattern(user_cuisines)
+        )
 
-        for restaurant_cuisine in restaurant_cuisines:
-            for user_cuisine in user_cuisines:
-                if user_cuisine.lower() in restaurant_cuisine.lower():
-                    matching.append(restaurant_cuisine)
-                    break
+    def _compile_cuisine_pattern(
+        self, user_cuisines: List[str]
+    ) -> Optional[re.Pattern]:
+        """
+        Compile user cuisines into one pattern matching any of them as a substring.
 
-        return matching
+        The regex engine checks every alternative in a single scan of each
+        restaurant cuisine, instead of one Python-level `in` test per pair.
+
+        Args:
+            user_cuisines: List of user's preferred cuisines
+
+        Returns:
+            Compiled pattern over the lowercased names, or None if there are none
+        """
+        if not user_cuisines:
+            return None
+        return re.compile(
+            "|".join(re.escape(user_cuisine.lower()) for user_cuisine in user_cuisines)
+        )
+
+    def _match_cuisines(
+        self, restaurant_cuisines: List[str], pattern: Optional[re.Pattern]
+    ) -> List[str]:
+        """
+        Get the restaurant cuisines matched by a compiled user cuisine pattern.
+
+        Args:
+            restaurant_cuisines: List of restaurant's cuisines
+            pattern: Pattern from _compile_cuisine_pattern
+
+        Returns:
+            List of matching cuisine names
+        """
+        if pattern is None:
+            return []
+        return [
+            restaurant_cuisine
+            for restaurant_cuisine in restaurant_cuisines
+            if pattern.search(restaurant_cuisine.lower())
+        ]
 
     def get_all_recommendations(
         self,
@@ -291,6 +473,9 @@ class RestaurantRecommendationService:
         """
         Get all three types of recommendations for a user.
 
+        The user's history is read once and each frequent location needs a
+        single Places request for all three types, issued concurrently.
+
         Args:
             user: User instance
             limit_per_type: Maximum number of recommendations per type
@@ -298,14 +483,33 @@ class RestaurantRecommendationService:
         Returns:
             Dictionary with keys 'good', 'cheap', 'cuisine_match' containing recommendation lists
         """
-        return {
-            "good": self.get_good_restaurants_recommendations(
-                user, limit_per_type, radius, per_location_limit
-            ),
-            "cheap": self.get_cheap_restaurants_recommendations(
-                user, limit_per_type, radius, per_location_limit
-            ),
-            "cuisine_match": self.get_cuisine_match_recommendations(
-                user, limit_per_type, radius, per_location_limit
-            ),
-        }
+        all_recommendations = {"good": [], "cheap": [], "cuisine_match": []}
+
+        frequent_locations = self.get_user_frequent_locations(user)
+        if not frequent_locations:
+            logger.info(f"No frequent locations found for user {user.email}")
+            return all_recommendations
+
+        recommendation_types = ["good", "cheap"]
+        user_cuisines = self.get_user_top_cuisines(user)
+        if user_cuisines:
+            recommendation_types.append("cuisine_match")
+        else:
+            logger.info(f"No cuisine preferences found for user {user.email}")
+
+        fetched = self._fetch_for_types(
+            frequent_locations,
+            recommendation_types,
+            radius,
+            per_location_limit,
+            user_cuisines=user_cuisines,
+        )
+        if user_cuisines:
+            self._add_matched_cuisines(fetched["cuisine_match"], user_cuisines)
+
+        for recommendation_type, recommendations in fetched.items():
+            all_recommendations[recommendation_type] = self._rank_recommendations(
+                recommendations, limit_per_type
+            )
+
+        return all_recommendations
@@ -3,12 +3,97 @@ Service for tracking user restaurant and cuisine visit statistics.
 """
 
 import logging
-from django.db import transaction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
 from django.db.models import F
+from django.utils import timezone
 from apps.restaurants.models import UserRestaurantVisit, UserCuisineStat
 
 logger = logging.getLogger(__name__)
 
+# Number of restaurants and cuisines in a user's recommendation context
+USER_CONTEXT_LIMIT = 5
+
+
+def _user_context_cache_key(user) -> str:
+    """Cache key for a user's recommendation context."""
+    return f"user:{user.pk}:recommendation_context"
+
+
+def _increment_restaurant_visit(user, restaurant):
+    """
+    Upsert the user's visit row for a restaurant in a single statement.
+
+    Uses INSERT ... ON CONFLICT DO UPDATE so concurrent receipts for the same
+    user/restaurant never race between the lookup and the increment.
+
+    Args:
+        user: User instance
+        restaurant: Restaurant instance
+
+    Returns:
+        The visit count after the increment
+    """
+    table = UserRestaurantVisit._meta.db_table
+    now = timezone.now()
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table}
+                (user_id, restaurant_id, visit_count, last_visit, created_at, updated_at)
+            VALUES (%s, %s, 1, %s, %s, %s)
+            ON CONFLICT (user_id, restaurant_id)
+            DO UPDATE SET visit_count = {table}.visit_count + 1
+            RETURNING visit_count
+            """,
+            [user.pk, restaurant.pk, now.date(), now, now],
+        )
+        return cursor.fetchone()[0]
+
+
+def _increment_cuisine_stats(user, restaurant):
+    """
+    Upsert the user's stat rows for every cuisine of a restaurant at once.
+
+    The restaurant's cuisine links are read, inserted or incremented and
+    joined back to their names in one statement, so the number of queries
+    does not grow with the number of cuisines.
+
+    Args:
+        user: User instance
+        restaurant: Restaurant instance
+
+    Returns:
+        Names of the cuisines whose stats were incremented
+    """
+    table = UserCuisineStat._meta.db_table
+    links_table = restaurant.cuisines.through._meta.db_table
+    cuisine_table = restaurant.cuisines.model._meta.db_table
+    now = timezone.now()
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH upserted AS (
+                INSERT INTO {table}
+                    (user_id, cuisine_id, visit_count, created_at, updated_at)
+                SELECT %s, links.cuisine_id, 1, %s, %s
+                FROM {links_table} AS links
+                WHERE links.restaurant_id = %s
+                ON CONFLICT (user_id, cuisine_id)
+                DO UPDATE SET visit_count = {table}.visit_count + 1
+                RETURNING cuisine_id
+            )
+            SELECT cuisine.name
+            FROM upserted
+            JOIN {cuisine_table} AS cuisine ON cuisine.id = upserted.cuisine_id
+            """,
+            [user.pk, now, now, restaurant.pk],
+        )
+        return [name for (name,) in cursor.fetchall()]
+
 
 def update_visit_stats(user, restaurant, visit_date):
     """
@@ -20,42 +105,26 @@ def update_visit_stats(user, restaurant, visit_date):
         visit_date: Date of the visit
     """
     with transaction.atomic():
-        # Update or create restaurant visit count
-        restaurant_visit, created = UserRestaurantVisit.objects.get_or_create(
-            user=user, restaurant=restaurant, defaults={"visit_count": 1}
-        )
+        # Insert or increment the restaurant visit count in one round trip
+        visit_count = _increment_restaurant_visit(user, restaurant)
 
-        if not created:
-            # Increment visit count and update last visit date
-            restaurant_visit.visit_count = F("visit_count") + 1
-            restaurant_visit.save(update_fields=["visit_count"])
-            # Refresh to get the updated count for logging
-            restaurant_visit.refresh_from_db()
+        # The cached top restaurants and cuisines are stale once this commits
+        cache_key = _user_context_cache_key(user)
+        transaction.on_commit(lambda: cache.delete(cache_key))
 
         logger.info(
             f"Updated restaurant visit: {user.email} -> {restaurant.name} "
-            f"({restaurant_visit.visit_count} visits)"
+            f"({visit_count} visits)"
         )
 
-        # Update cuisine statistics for all cuisines of this restaurant
-        restaurant_cuisines = restaurant.cuisines.all()
+        # Insert or increment the stats for all of the restaurant's cuisines
+        cuisines = _increment_cuisine_stats(user, restaurant)
+        if not cuisines:
+            return
 
-        for cuisine in restaurant_cuisines:
-            cuisine_stat, created = UserCuisineStat.objects.get_or_create(
-                user=user, cuisine=cuisine, defaults={"visit_count": 1}
-            )
-
-            if not created:
-                # Increment cuisine visit count
-                cuisine_stat.visit_count = F("visit_count") + 1
-                cuisine_stat.save(update_fields=["visit_count"])
-                # Refresh to get the updated count for logging
-                cuisine_stat.refresh_from_db()
-
-            logger.info(
-                f"Updated cuisine stat: {user.email} -> {cuisine.name} "
-                f"({cuisine_stat.visit_count} visits)"
-            )
+        logger.info(
+            f"Updated cuisine stats: {user.email} -> {', '.join(sorted(cuisines))}"
+        )
 
 
 def get_user_restaurant_stats(user, limit=None):
@@ -128,3 +197,74 @@ def get_user_top_cuisines(user, limit=10):
     """
     stats = UserCuisineStat.objects.filter(user=user).select_related("cuisine")[:limit]
     return [(stat.cuisine, stat.visit_count) for stat in stats]
+
+
+def get_user_top_restaurant_names(user, limit=10):
+    """
+    Get the names and visit counts of the user's most visited restaurants.
+
+    Same rows as get_user_top_restaurants, read as plain values in one query
+    without building model instances.
+
+    Args:
+        user: User instance
+        limit: Number of top restaurants to return
+
+    Returns:
+        List of dicts with name and visit_count
+    """
+    return list(
+        UserRestaurantVisit.objects.filter(user=user).values(
+            "visit_count", name=F("restaurant__name")
+        )[:limit]
+    )
+
+
+def get_user_top_cuisine_names(user, limit=10):
+    """
+    Get the names and visit counts of the user's most visited cuisine types.
+
+    Same rows as get_user_top_cuisines, read as plain values in one query
+    without building model instances.
+
+    Args:
+        user: User instance
+        limit: Number of top cuisines to return
+
+    Returns:
+        List of dicts with name and visit_count
+    """
+    return list(
+        UserCuisineStat.objects.filter(user=user).values(
+            "visit_count", name=F("cuisine__name")
+        )[:limit]
+    )
+
+
+def get_user_context(user):
+    """
+    Get the user's top restaurants and cuisines for recommendation responses.
+
+    Cached per user until the next visit is recorded, or for
+    RECOMMENDATION_USER_CONTEXT_CACHE_TTL seconds.
+
+    Args:
+        user: User instance
+
+    Returns:
+        Dict with frequent_restaurants and preferred_cuisines lists of
+        name and visit_count dicts
+    """
+    cache_key = _user_context_cache_key(user)
+    context = cache.get(cache_key)
+    if context is None:
+        context = {
+            "frequent_restaurants": get_user_top_restaurant_names(
+                user, limit=USER_CONTEXT_LIMIT
+            ),
+            "preferred_cuisines": get_user_top_cuisine_names(
+                user, limit=USER_CONTEXT_LIMIT
+            ),
+        }
+        cache.set(cache_key, context, settings.RECOMMENDATION_USER_CONTEXT_CACHE_TTL)
+    return context
@@ -1,14 +1,259 @@
+import hashlib
+import json
 import logging
-from typing import Optional
-from celery import shared_task
+import random
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+from celery import group, shared_task
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 from django.db import transaction
 
 from .models import Restaurant, Cuisine
-from .services import GooglePlacesService
+from .services import (
+    CircuitBreakerOpen,
+    GooglePlacesService,
+    get_places_service,
+    places_circuit_breaker,
+)
 
 logger = logging.getLogger(__name__)
 
+# How long a Places response fingerprint is trusted; once it expires the next
+# update re-applies the data even if Google returns the same payload
+PLACES_DATA_HASH_TTL = 60 * 60 * 24
+
+# How long update_all_restaurants treats a queued update as still pending
+UPDATE_PENDING_TTL = 60 * 60
+
+# Cache counter of Google Places calls in flight across all workers. The TTL
+# bounds how long slots leaked by a killed worker stay taken.
+PLACES_ACTIVE_CALLS_KEY = "google_places:active_calls"
+PLACES_ACTIVE_CALLS_TTL = 5 * 60
+
+
+class PlacesBulkheadFull(Exception):
+    """Raised when every Google Places call slot is taken."""
+
+
+def _places_data_cache_key(restaurant_id: str) -> str:
+    """Cache key for the fingerprint of a restaurant's last applied Places data."""
+    return f"restaurant:{restaurant_id}:places_data_hash"
+
+
+def _update_pending_cache_key(restaurant_id: str) -> str:
+    """Cache key marking a restaurant update queued by update_all_restaurants."""
+    return f"restaurant:{restaurant_id}:update_pending"
+
+
+def _places_data_hash(data: Dict) -> str:
+    """Return a stable fingerprint of a Google Places details payload."""
+    payload = json.dumps(data, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+@contextmanager
+def _places_call_slot():
+    """
+    Hold one of the GOOGLE_PLACES_MAX_CONCURRENT_CALLS slots shared by all
+    workers for the duration of the block.
+
+    Raises:
+        PlacesBulkheadFull: if no slot is free
+    """
+    cache.add(PLACES_ACTIVE_CALLS_KEY, 0, timeout=PLACES_ACTIVE_CALLS_TTL)
+    try:
+        active_calls = cache.incr(PLACES_ACTIVE_CALLS_KEY)
+    except ValueError:
+        # The counter expired since the add; count from zero again
+        cache.set(PLACES_ACTIVE_CALLS_KEY, 1, timeout=PLACES_ACTIVE_CALLS_TTL)
+        active_calls = 1
+    # Keep the counter alive while slots are held; only an idle counter expires
+    cache.touch(PLACES_ACTIVE_CALLS_KEY, PLACES_ACTIVE_CALLS_TTL)
+
+    if active_calls > settings.GOOGLE_PLACES_MAX_CONCURRENT_CALLS:
+        _release_places_call_slot()
+        raise PlacesBulkheadFull()
+
+    try:
+        yield
+    finally:
+        _release_places_call_slot()
+
+
+def _release_places_call_slot():
+    """Give back a slot taken by _places_call_slot."""
+    try:
+        active_calls = cache.decr(PLACES_ACTIVE_CALLS_KEY)
+    except ValueError:
+        # The counter expired while the slot was held; it counts as zero
+        return
+    if active_calls < 0:
+        # The counter was restarted while the slot was held
+        cache.incr(PLACES_ACTIVE_CALLS_KEY)
+
+
+def _get_or_create_cuisine_ids(cuisine_names: Iterable[str]) -> List[int]:
+    """
+    Resolve cuisine names to ids, creating any cuisines that don't exist yet.
+
+    Issues at most three queries no matter how many names are passed.
+
+    Args:
+        cuisine_names: Cuisine names to resolve
+
+    Returns:
+        List of Cuisine ids
+    """
+    names = set(cuisine_names)
+    cuisine_ids = dict(Cuisine.objects.filter(name__in=names).values_list("name", "id"))
+
+    missing_names = names - cuisine_ids.keys()
+    if missing_names:
+        # ignore_conflicts covers cuisines created concurrently by another task
+        Cuisine.objects.bulk_create(
+            [Cuisine(name=name) for name in missing_names], ignore_conflicts=True
+        )
+        cuisine_ids.update(
+            Cuisine.objects.filter(name__in=missing_names).values_list("name", "id")
+        )
+
+    return list(cuisine_ids.values())
+
+
+def _link_cuisines(
+    restaurant: Restaurant, cuisine_ids: List[int], replace: bool = False
+) -> None:
+    """
+    Link cuisines to a restaurant with one INSERT into the through table.
+
+    Unlike the M2M manager this skips the query for already linked ids and
+    sends no m2m_changed signals (nothing listens for them).
+
+    Args:
+        restaurant: Restaurant to link
+        cuisine_ids: Cuisine ids to link
+        replace: Remove the restaurant's existing cuisine links first
+    """
+    through = Restaurant.cuisines.through
+    if replace:
+        through.objects.filter(restaurant_id=restaurant.id).delete()
+    through.objects.bulk_create(
+        [
+            through(restaurant_id=restaurant.id, cuisine_id=cuisine_id)
+            for cuisine_id in cuisine_ids
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def _resolve_stub_place_id(
+    restaurant: Restaurant,
+    places_service: GooglePlacesService,
+    updated_fields: List[str],
+) -> bool:
+    """
+    Look up the real place_id of a stub restaurant created from a receipt.
+
+    Does nothing for restaurants that are not stubs.
+
+    Returns:
+        False if the restaurant is a stub whose place could not be found
+    """
+    if not restaurant.is_stub:
+        return True
+
+    logger.info(f"Found stub restaurant {restaurant.name}, searching for real place_id")
+    text_query = f"{restaurant.name}, {restaurant.address}"
+    with _places_call_slot():
+        place_candidate = places_service.find_place_from_text(text_query)
+
+    if not place_candidate or not place_candidate.get("place_id"):
+        logger.warning(
+            f"Could not find real place_id for stub restaurant {restaurant.name}"
+        )
+        return False
+
+    logger.info(
+        f"Found real place_id {place_candidate['place_id']} for stub {restaurant.name}"
+    )
+    restaurant.place_id = place_candidate["place_id"]
+    updated_fields.append("place_id")
+    return True
+
+
+def _places_data_unchanged(restaurant_id: str, data_hash: str) -> bool:
+    """Return whether Google returned exactly what was applied last time."""
+    return cache.get(_places_data_cache_key(restaurant_id)) == data_hash
+
+
+def _diff_places_data(
+    restaurant: Restaurant, data: Dict, updated_fields: List[str]
+) -> Optional[List[int]]:
+    """
+    Copy the Google Places data that differs onto a restaurant.
+
+    The names of changed fields are appended to updated_fields. Nothing is
+    written, so a transaction opened afterwards only spans the writes.
+
+    Returns:
+        The new cuisine ids if the cuisines changed, otherwise None
+    """
+    for field in ("name", "address", "latitude", "longitude"):
+        if data.get(field) and data[field] != getattr(restaurant, field):
+            setattr(restaurant, field, data[field])
+            updated_fields.append(field)
+
+    if data.get("rating"):
+        # Places returns a float; compare at the model field's precision
+        rating = Restaurant._meta.get_field("rating").to_python(data["rating"])
+        if rating != restaurant.rating:
+            restaurant.rating = rating
+            updated_fields.append("rating")
+
+    # Handle cuisines (many-to-many relationship)
+    if data.get("cuisines"):
+        current_cuisine_names = {cuisine.name for cuisine in restaurant.cuisines.all()}
+        new_cuisine_names = set(data["cuisines"])
+
+        if current_cuisine_names != new_cuisine_names:
+            updated_fields.append("cuisines")
+            return _get_or_create_cuisine_ids(new_cuisine_names)
+
+    return None
+
+
+def _save_restaurant_update(
+    restaurant: Restaurant,
+    updated_fields: List[str],
+    cuisine_ids: Optional[List[int]] = None,
+) -> None:
+    """Write the changed fields of a restaurant and its cuisine links together."""
+    if not updated_fields:
+        return
+
+    with transaction.atomic():
+        if cuisine_ids is not None:
+            _link_cuisines(restaurant, cuisine_ids, replace=True)
+
+        # Write only the changed columns; cuisines live in the M2M table
+        model_fields = [f for f in updated_fields if f != "cuisines"]
+        restaurant.save(update_fields=model_fields + ["updated_at"])
+
+
+def _settle_update_pending(restaurant_id: str, requeued: bool) -> None:
+    """
+    Clear the pending marker of a finished update, or refresh it while the
+    update is deferred or retried so update_all_restaurants doesn't queue a
+    second copy.
+    """
+    key = _update_pending_cache_key(restaurant_id)
+    if requeued:
+        cache.set(key, 1, timeout=UPDATE_PENDING_TTL)
+    else:
+        cache.delete(key)
+
 
 @shared_task(bind=True, max_retries=3)
 def update_restaurant_info(self, restaurant_id: str):
@@ -18,113 +263,91 @@ def update_restaurant_info(self, restaurant_id: str):
     Args:
         restaurant_id: UUID of the restaurant to update
     """
+    # Set when this update is queued again, so it still counts as pending
+    requeued = False
     try:
-        restaurant = Restaurant.objects.get(id=restaurant_id)
+        # Load only the columns compared below, and prefetch cuisines so the
+        # cuisine diff needs no extra query
+        restaurant = (
+            Restaurant.objects.only(
+                "id",
+                "place_id",
+                "name",
+                "address",
+                "latitude",
+                "longitude",
+                "rating",
+                "is_stub",
+                "updated_at",
+            )
+            .prefetch_related("cuisines")
+            .get(id=restaurant_id)
+        )
         logger.info(
             f"Updating restaurant info for {restaurant.name} (ID: {restaurant_id})"
         )
 
-        # Initialize Google Places service
-        places_service = GooglePlacesService()
+        # Reuse this worker's Google Places service
+        places_service = get_places_service()
+
+        # Fields changed on the model, saved together at the end
+        updated_fields = []
 
         # If this is a stub restaurant, try to find the real place_id first
-        if restaurant.place_id.startswith("stub_"):
-            logger.info(
-                f"Found stub restaurant {restaurant.name}, searching for real place_id"
-            )
-            text_query = f"{restaurant.name}, {restaurant.address}"
-            place_candidate = places_service.find_place_from_text(text_query)
-
-            if place_candidate and place_candidate.get("place_id"):
-                logger.info(
-                    f"Found real place_id {place_candidate['place_id']} for stub {restaurant.name}"
-                )
-                restaurant.place_id = place_candidate["place_id"]
-                restaurant.save(update_fields=["place_id"])
-            else:
-                logger.warning(
-                    f"Could not find real place_id for stub restaurant {restaurant.name}"
-                )
-                return {
-                    "status": "error",
-                    "restaurant_id": restaurant_id,
-                    "message": "Could not find real place_id for stub restaurant",
-                }
+        if not _resolve_stub_place_id(restaurant, places_service, updated_fields):
+            return {
+                "status": "error",
+                "restaurant_id": restaurant_id,
+                "message": "Could not find real place_id for stub restaurant",
+            }
 
         # Fetch updated data from Google Places
-        data = places_service.fetch_restaurant_details(restaurant.place_id)
+        with _places_call_slot():
+            data = places_service.fetch_restaurant_details(restaurant.place_id)
 
         if not data:
             logger.error(f"Failed to fetch data for restaurant {restaurant_id}")
+            # Still keep a resolved place_id so the next run can skip the lookup
+            _save_restaurant_update(restaurant, updated_fields)
             return {
                 "status": "error",
                 "restaurant_id": restaurant_id,
                 "message": "Failed to fetch data from Google Places API",
             }
 
-        print("--------------------------------")
-        print("Data extracted from Google Places API:")
-        print(data)
-        print("--------------------------------")
-
-        # Update restaurant with new data
-        with transaction.atomic():
-            updated_fields = []
-
-            if data.get("name") and data["name"] != restaurant.name:
-                restaurant.name = data["name"]
-                updated_fields.append("name")
-
-            if data.get("address") and data["address"] != restaurant.address:
-                restaurant.address = data["address"]
-                updated_fields.append("address")
-
-            # Handle cuisines (many-to-many relationship)
-            if data.get("cuisines"):
-                current_cuisine_names = set(
-                    restaurant.cuisines.values_list("name", flat=True)
-                )
-                new_cuisine_names = set(data["cuisines"])
-
-                if current_cuisine_names != new_cuisine_names:
-                    # Create cuisine objects if they don't exist
-                    cuisine_objects = []
-                    for cuisine_name in new_cuisine_names:
-                        cuisine, created = Cuisine.objects.get_or_create(
-                            name=cuisine_name
-                        )
-                        cuisine_objects.append(cuisine)
-
-                    # Update the many-to-many relationship
-                    restaurant.cuisines.set(cuisine_objects)
-                    updated_fields.append("cuisines")
-
-            if data.get("rating") and data["rating"] != restaurant.rating:
-                restaurant.rating = data["rating"]
-                updated_fields.append("rating")
-
-            if data.get("latitude") and data["latitude"] != restaurant.latitude:
-                restaurant.latitude = data["latitude"]
-                updated_fields.append("latitude")
-
-            if data.get("longitude") and data["longitude"] != restaurant.longitude:
-                restaurant.longitude = data["longitude"]
-                updated_fields.append("longitude")
-
-            # Always update the updated_at timestamp
-            restaurant.save()
-
-            logger.info(
-                f"Restaurant {restaurant_id} updated. Fields changed: {updated_fields}"
-            )
+        logger.debug("Data extracted from Google Places API: %s", data)
 
+        # Nothing to diff if Google returned exactly what was applied last time
+        data_hash = _places_data_hash(data)
+        if not updated_fields and _places_data_unchanged(restaurant_id, data_hash):
+            logger.info(f"Restaurant {restaurant_id} unchanged since last update")
             return {
-                "status": "success",
+                "status": "unchanged",
                 "restaurant_id": restaurant_id,
-                "updated_fields": updated_fields,
+                "updated_fields": [],
                 "restaurant_name": restaurant.name,
             }
 
+        cuisine_ids = _diff_places_data(restaurant, data, updated_fields)
+        _save_restaurant_update(restaurant, updated_fields, cuisine_ids)
+
+        # Only remember the payload once it is committed
+        cache_key = _places_data_cache_key(restaurant_id)
+        transaction.on_commit(
+            lambda: cache.set(cache_key, data_hash, PLACES_DATA_HASH_TTL)
+        )
+
+        logger.info(
+            f"Restaurant {restaurant_id} updated. Fields changed: {updated_fields}"
+        )
+
+        return {
+            "status": "success",
+            "restaurant_id": restaurant_id,
+            "updated_fields": updated_fields,
+            "restaurant_name": restaurant.name,
+        }
+
     except Restaurant.DoesNotExist:
         logger.error(f"Restaurant with ID {restaurant_id} not found")
         return {
@@ -133,15 +356,48 @@ def update_restaurant_info(self, restaurant_id: str):
             "message": "Restaurant not found",
         }
 
+    except PlacesBulkheadFull:
+        # Other workers are using every Places slot; try again shortly
+        countdown = random.uniform(5, 30)
+        logger.info(
+            f"Google Places call limit reached, deferring update of restaurant "
+            f"{restaurant_id} by {countdown:.0f} seconds"
+        )
+        update_restaurant_info.apply_async(args=[restaurant_id], countdown=countdown)
+        requeued = True
+        return {
+            "status": "deferred",
+            "restaurant_id": restaurant_id,
+            "message": "Google Places call limit reached",
+        }
+
+    except CircuitBreakerOpen:
+        # Google Places is failing; try again once the breaker may have
+        # recovered instead of spending a retry on a call that can't succeed
+        countdown = places_circuit_breaker.reset_timeout + random.uniform(0, 60)
+        logger.warning(
+            f"Google Places unavailable, deferring update of restaurant "
+            f"{restaurant_id} by {countdown:.0f} seconds"
+        )
+        update_restaurant_info.apply_async(args=[restaurant_id], countdown=countdown)
+        requeued = True
+        return {
+            "status": "deferred",
+            "restaurant_id": restaurant_id,
+            "message": "Google Places circuit breaker is open",
+        }
+
     except Exception as exc:
         logger.error(f"Error updating restaurant {restaurant_id}: {str(exc)}")
 
-        # Retry the task with exponential backoff
+        # Retry the task with exponential backoff and full jitter so failed
+        # tasks don't all come back at the same moment
         if self.request.retries < self.max_retries:
-            countdown = 2**self.request.retries * 60  # 1min, 2min, 4min
+            countdown = random.uniform(0, 2**self.request.retries * 60)
             logger.info(
-                f"Retrying task in {countdown} seconds (attempt {self.request.retries + 1})"
+                f"Retrying task in {countdown:.0f} seconds (attempt {self.request.retries + 1})"
             )
+            requeued = True
             raise self.retry(countdown=countdown, exc=exc)
 
         return {
@@ -150,6 +406,9 @@ def update_restaurant_info(self, restaurant_id: str):
             "message": f"Task failed after {self.max_retries} retries: {str(exc)}",
         }
 
+    finally:
+        _settle_update_pending(restaurant_id, requeued)
+
 
 @shared_task
 def update_all_restaurants():
@@ -159,10 +418,10 @@ def update_all_restaurants():
     """
     logger.info("Starting bulk restaurant update task")
 
-    restaurants = Restaurant.objects.all()
-    total_count = restaurants.count()
+    # Only the ids are needed; skip the COUNT query and model hydration
+    restaurant_ids = list(Restaurant.objects.values_list("id", flat=True))
 
-    if total_count == 0:
+    if not restaurant_ids:
         logger.info("No restaurants to update")
         return {
             "status": "success",
@@ -170,18 +429,50 @@ def update_all_restaurants():
             "total_processed": 0,
         }
 
-    # Queue individual update tasks for each restaurant
-    task_ids = []
-    for restaurant in restaurants:
-        task = update_restaurant_info.delay(str(restaurant.id))
-        task_ids.append(task.id)
+    # Skip restaurants whose update from a previous run is still queued, so
+    # a slow queue doesn't accumulate duplicate updates. Beat is the only
+    # caller, so a batched check-then-set is enough here.
+    pending_keys = {
+        _update_pending_cache_key(restaurant_id): str(restaurant_id)
+        for restaurant_id in restaurant_ids
+    }
+    already_pending = cache.get_many(pending_keys)
+    to_queue = {
+        key: restaurant_id
+        for key, restaurant_id in pending_keys.items()
+        if key not in already_pending
+    }
+    skipped = len(already_pending)
+
+    if not to_queue:
+        logger.info(f"All {skipped} restaurant updates are already queued")
+        return {
+            "status": "success",
+            "message": "All restaurant updates are already queued",
+            "total_processed": 0,
+            "skipped": skipped,
+        }
+
+    cache.set_many(dict.fromkeys(to_queue, 1), timeout=UPDATE_PENDING_TTL)
+
+    # Queue all update tasks as one group so they share a single broker
+    # connection instead of publishing one .delay() at a time
+    job = group(
+        update_restaurant_info.s(restaurant_id) for restaurant_id in to_queue.values()
+    )
+    result = job.apply_async()
+    task_ids = [task.id for task in result.results]
 
-    logger.info(f"Queued {len(task_ids)} restaurant update tasks")
+    logger.info(
+        f"Queued {len(task_ids)} restaurant update tasks, "
+        f"skipped {skipped} already queued"
+    )
 
     return {
         "status": "success",
         "message": f"Queued {len(task_ids)} restaurant update tasks",
         "total_processed": len(task_ids),
+        "skipped": skipped,
         "task_ids": task_ids,
     }
 
@@ -208,11 +499,16 @@ def create_restaurant_from_places_data(
             logger.info(f"Restaurant with place_id {place_id} already exists")
             return str(existing_restaurant.id)
 
-        # Initialize Google Places service
-        places_service = GooglePlacesService()
+        # Reuse this worker's Google Places service
+        places_service = get_places_service()
 
         # Try to fetch detailed data from Google Places
-        data = places_service.fetch_restaurant_details(place_id)
+        try:
+            with _places_call_slot():
+                data = places_service.fetch_restaurant_details(place_id)
+        except (CircuitBreakerOpen, PlacesBulkheadFull):
+            # Fall back to a basic record; the queued update fills it in later
+            data = None
 
         if data:
             # Create restaurant with Google Places data
@@ -227,11 +523,7 @@ def create_restaurant_from_places_data(
 
             # Handle cuisines (many-to-many relationship)
             if data.get("cuisines"):
-                cuisine_objects = []
-                for cuisine_name in data["cuisines"]:
-                    cuisine, created = Cuisine.objects.get_or_create(name=cuisine_name)
-                    cuisine_objects.append(cuisine)
-                restaurant.cuisines.set(cuisine_objects)
+                _link_cuisines(restaurant, _get_or_create_cuisine_ids(data["cuisines"]))
 
             logger.info(f"Created restaurant {restaurant.name} with Google Places data")
         else:
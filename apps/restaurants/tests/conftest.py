@@ -0,0 +1,45 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from apps.restaurants.models import Cuisine, Restaurant
+
+User = get_user_model()
+
+
+@pytest.fixture(scope="class")
+def class_transaction(django_db_setup, django_db_blocker):
+    """
+    Wrap a test class in a transaction that is rolled back once it finishes.
+
+    Rows created by class-scoped fixtures live inside it, and each test's
+    own changes are rolled back to a savepoint, so the rows are shared by
+    the class without leaking into other tests.
+    """
+    with django_db_blocker.unblock():
+        with transaction.atomic():
+            yield
+            transaction.set_rollback(True)
+
+
+@pytest.fixture(scope="class")
+def shared_user(class_transaction):
+    """User shared by every test in a class."""
+    return User.objects.create_user(email="test@example.com", password="test123")
+
+
+@pytest.fixture(scope="class")
+def shared_italian_cuisine(class_transaction):
+    """Italian cuisine shared by every test in a class."""
+    return Cuisine.objects.create(name="Italian")
+
+
+@pytest.fixture(scope="class")
+def shared_restaurant(class_transaction, shared_italian_cuisine):
+    """Italian restaurant shared by every test in a class."""
+    restaurant = Restaurant.objects.create(
+        place_id="test123", name="Test Restaurant", address="123 Test Street"
+    )
+    Restaurant.cuisines.through.objects.create(
+        restaurant=restaurant, cuisine=shared_italian_cuisine
+    )
+    return restaurant
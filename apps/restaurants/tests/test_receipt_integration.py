@@ -7,6 +7,7 @@ from datetime import date
 from decimal import Decimal
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models.signals import post_save
 from apps.receipts.models import Receipt
 from apps.restaurants.models import (
     Restaurant,
@@ -19,26 +20,29 @@ User = get_user_model()
 pytestmark = pytest.mark.django_db
 
 
+def _receipt_image(name):
+    """Empty JPEG upload; these tests never read the image contents."""
+    return SimpleUploadedFile(name, b"", content_type="image/jpeg")
+
+
 class TestReceiptVisitIntegration:
     """Test integration between receipt creation and visit tracking."""
 
     @pytest.mark.integration
-    def test_receipt_creation_updates_visit_stats(self):
+    def test_receipt_creation_updates_visit_stats(
+        self,
+        django_assert_num_queries,
+        shared_user,
+        shared_italian_cuisine,
+        shared_restaurant,
+    ):
         """Test that creating a receipt automatically updates visit statistics."""
-        # Create test data
-        user = User.objects.create_user(email="test@example.com", password="test123")
-        cuisine = Cuisine.objects.create(name="Italian")
-        restaurant = Restaurant.objects.create(
-            place_id="test123", name="Test Restaurant", address="123 Test Street"
-        )
-        restaurant.cuisines.set([cuisine])
+        user = shared_user
+        cuisine = shared_italian_cuisine
+        restaurant = shared_restaurant
 
         # Create a mock image file
-        image_file = SimpleUploadedFile(
-            name="test_receipt.jpg",
-            content=b"fake image content",
-            content_type="image/jpeg",
-        )
+        image_file = _receipt_image("test_receipt.jpg")
 
         # Verify no visit stats exist initially
         assert (
@@ -47,14 +51,17 @@ class TestReceiptVisitIntegration:
         )
         assert UserCuisineStat.objects.filter(user=user, cuisine=cuisine).count() == 0
 
-        # Create receipt - this should trigger the signal
-        receipt = Receipt.objects.create(
-            user=user,
-            restaurant=restaurant,
-            date=date(2023, 1, 1),
-            price=Decimal("25.99"),
-            image=image_file,
-        )
+        # Create receipt - this should trigger the signal. Budget: the receipt
+        # insert plus the signal's savepoint, visit upsert, cuisine stat
+        # upsert and savepoint release
+        with django_assert_num_queries(5):
+            receipt = Receipt.objects.create(
+                user=user,
+                restaurant=restaurant,
+                date=date(2023, 1, 1),
+                price=Decimal("25.99"),
+                image=image_file,
+            )
 
         # Verify visit stats were created
         restaurant_visit = UserRestaurantVisit.objects.get(
@@ -66,19 +73,16 @@ class TestReceiptVisitIntegration:
         assert cuisine_stat.visit_count == 1
 
         # Create another receipt for the same restaurant
-        image_file2 = SimpleUploadedFile(
-            name="test_receipt2.jpg",
-            content=b"fake image content 2",
-            content_type="image/jpeg",
-        )
+        image_file2 = _receipt_image("test_receipt2.jpg")
 
-        receipt2 = Receipt.objects.create(
-            user=user,
-            restaurant=restaurant,
-            date=date(2023, 1, 2),
-            price=Decimal("18.50"),
-            image=image_file2,
-        )
+        with django_assert_num_queries(5):
+            receipt2 = Receipt.objects.create(
+                user=user,
+                restaurant=restaurant,
+                date=date(2023, 1, 2),
+                price=Decimal("18.50"),
+                image=image_file2,
+            )
 
         # Verify visit stats were incremented
         restaurant_visit.refresh_from_db()
@@ -88,40 +92,47 @@ class TestReceiptVisitIntegration:
         assert cuisine_stat.visit_count == 2
 
     @pytest.mark.integration
-    def test_receipt_creation_multiple_cuisines(self):
+    def test_receipt_creation_multiple_cuisines(
+        self, django_assert_num_queries, shared_user, shared_italian_cuisine
+    ):
         """Test receipt creation with restaurant having multiple cuisines."""
         # Create test data
-        user = User.objects.create_user(email="test@example.com", password="test123")
-        italian_cuisine = Cuisine.objects.create(name="Italian")
+        user = shared_user
+        italian_cuisine = shared_italian_cuisine
         pizza_cuisine = Cuisine.objects.create(name="Pizza")
         restaurant = Restaurant.objects.create(
-            place_id="test123",
+            place_id="test456",
             name="Italian Pizza Restaurant",
             address="123 Test Street",
         )
-        restaurant.cuisines.set([italian_cuisine, pizza_cuisine])
-
-        # Create receipt
-        image_file = SimpleUploadedFile(
-            name="test_receipt.jpg",
-            content=b"fake image content",
-            content_type="image/jpeg",
-        )
-
-        receipt = Receipt.objects.create(
-            user=user,
-            restaurant=restaurant,
-            date=date(2023, 1, 1),
-            price=Decimal("30.00"),
-            image=image_file,
+        Through = Restaurant.cuisines.through
+        Through.objects.bulk_create(
+            [
+                Through(restaurant=restaurant, cuisine=cuisine)
+                for cuisine in (italian_cuisine, pizza_cuisine)
+            ]
         )
 
-        # Verify both cuisine stats were created
-        italian_stat = UserCuisineStat.objects.get(user=user, cuisine=italian_cuisine)
-        assert italian_stat.visit_count == 1
-
-        pizza_stat = UserCuisineStat.objects.get(user=user, cuisine=pizza_cuisine)
-        assert pizza_stat.visit_count == 1
+        # Create receipt
+        image_file = _receipt_image("test_receipt.jpg")
+
+        with django_assert_num_queries(5):
+            receipt = Receipt.objects.create(
+                user=user,
+                restaurant=restaurant,
+                date=date(2023, 1, 1),
+                price=Decimal("30.00"),
+                image=image_file,
+            )
+
+        # Verify both cuisine stats were created, in one query
+        counts = dict(
+            UserCuisineStat.objects.filter(
+                user=user, cuisine__in=[italian_cuisine, pizza_cuisine]
+            ).values_list("cuisine_id", "visit_count")
+        )
+        assert counts[italian_cuisine.id] == 1
+        assert counts[pizza_cuisine.id] == 1
 
         # Verify restaurant visit was created
         restaurant_visit = UserRestaurantVisit.objects.get(
@@ -130,108 +141,114 @@ class TestReceiptVisitIntegration:
         assert restaurant_visit.visit_count == 1
 
     @pytest.mark.integration
-    def test_receipt_without_restaurant_no_stats(self):
+    def test_receipt_without_restaurant_no_stats(
+        self, django_assert_num_queries, shared_user
+    ):
         """Test that receipts without restaurant don't create visit stats."""
-        # Create test data
-        user = User.objects.create_user(email="test@example.com", password="test123")
+        user = shared_user
 
         # Create receipt without restaurant
-        image_file = SimpleUploadedFile(
-            name="test_receipt.jpg",
-            content=b"fake image content",
-            content_type="image/jpeg",
-        )
+        image_file = _receipt_image("test_receipt.jpg")
 
-        receipt = Receipt.objects.create(
-            user=user, date=date(2023, 1, 1), price=Decimal("25.99"), image=image_file
-        )
+        with django_assert_num_queries(1):
+            receipt = Receipt.objects.create(
+                user=user,
+                date=date(2023, 1, 1),
+                price=Decimal("25.99"),
+                image=image_file,
+            )
 
         # Verify no visit stats were created
         assert UserRestaurantVisit.objects.filter(user=user).count() == 0
         assert UserCuisineStat.objects.filter(user=user).count() == 0
 
     @pytest.mark.integration
-    def test_multiple_users_separate_stats(self):
+    def test_multiple_users_separate_stats(
+        self,
+        django_assert_num_queries,
+        shared_user,
+        shared_italian_cuisine,
+        shared_restaurant,
+    ):
         """Test that visit stats are properly separated by user."""
         # Create test data
-        user1 = User.objects.create_user(email="user1@example.com", password="test123")
+        user1 = shared_user
         user2 = User.objects.create_user(email="user2@example.com", password="test123")
-        cuisine = Cuisine.objects.create(name="Italian")
-        restaurant = Restaurant.objects.create(
-            place_id="test123", name="Test Restaurant", address="123 Test Street"
-        )
-        restaurant.cuisines.set([cuisine])
+        cuisine = shared_italian_cuisine
+        restaurant = shared_restaurant
 
         # Create receipts for both users
-        image_file1 = SimpleUploadedFile(
-            name="user1_receipt.jpg",
-            content=b"fake image content 1",
-            content_type="image/jpeg",
-        )
-
-        image_file2 = SimpleUploadedFile(
-            name="user2_receipt.jpg",
-            content=b"fake image content 2",
-            content_type="image/jpeg",
-        )
-
-        Receipt.objects.create(
-            user=user1,
-            restaurant=restaurant,
-            date=date(2023, 1, 1),
-            price=Decimal("25.99"),
-            image=image_file1,
-        )
-
-        Receipt.objects.create(
-            user=user2,
-            restaurant=restaurant,
-            date=date(2023, 1, 1),
-            price=Decimal("30.50"),
-            image=image_file2,
-        )
-
-        # Verify each user has their own stats
-        user1_restaurant_visit = UserRestaurantVisit.objects.get(
-            user=user1, restaurant=restaurant
-        )
-        assert user1_restaurant_visit.visit_count == 1
-
-        user2_restaurant_visit = UserRestaurantVisit.objects.get(
-            user=user2, restaurant=restaurant
-        )
-        assert user2_restaurant_visit.visit_count == 1
-
-        user1_cuisine_stat = UserCuisineStat.objects.get(user=user1, cuisine=cuisine)
-        assert user1_cuisine_stat.visit_count == 1
-
-        user2_cuisine_stat = UserCuisineStat.objects.get(user=user2, cuisine=cuisine)
-        assert user2_cuisine_stat.visit_count == 1
+        image_file1 = _receipt_image("user1_receipt.jpg")
+
+        image_file2 = _receipt_image("user2_receipt.jpg")
+
+        # Insert both receipts at once; bulk_create skips post_save, so send
+        # it ourselves as Receipt.objects.create() would. Budget: one insert
+        # plus four signal queries per receipt
+        with django_assert_num_queries(9):
+            receipts = Receipt.objects.bulk_create(
+                [
+                    Receipt(
+                        user=user1,
+                        restaurant=restaurant,
+                        date=date(2023, 1, 1),
+                        price=Decimal("25.99"),
+                        image=image_file1,
+                    ),
+                    Receipt(
+                        user=user2,
+                        restaurant=restaurant,
+                        date=date(2023, 1, 1),
+                        price=Decimal("30.50"),
+                        image=image_file2,
+                    ),
+                ]
+            )
+            for receipt in receipts:
+                post_save.send(sender=Receipt, instance=receipt, created=True)
+
+        # Verify each user has their own stats, one query per stat table
+        visits = dict(
+            UserRestaurantVisit.objects.filter(restaurant=restaurant).values_list(
+                "user_id", "visit_count"
+            )
+        )
+        assert visits[user1.id] == 1
+        assert visits[user2.id] == 1
+
+        cuisine_stats = dict(
+            UserCuisineStat.objects.filter(cuisine=cuisine).values_list(
+                "user_id", "visit_count"
+            )
+        )
+        assert cuisine_stats[user1.id] == 1
+        assert cuisine_stats[user2.id] == 1
 
         # Create another receipt for user1
-        image_file3 = SimpleUploadedFile(
-            name="user1_receipt2.jpg",
-            content=b"fake image content 3",
-            content_type="image/jpeg",
-        )
+        image_file3 = _receipt_image("user1_receipt2.jpg")
 
-        Receipt.objects.create(
-            user=user1,
-            restaurant=restaurant,
-            date=date(2023, 1, 2),
-            price=Decimal("22.75"),
-            image=image_file3,
-        )
+        with django_assert_num_queries(5):
+            Receipt.objects.create(
+                user=user1,
+                restaurant=restaurant,
+                date=date(2023, 1, 2),
+                price=Decimal("22.75"),
+                image=image_file3,
+            )
 
         # Verify only user1's stats were incremented
-        user1_restaurant_visit.refresh_from_db()
-        assert user1_restaurant_visit.visit_count == 2
-
-        user2_restaurant_visit.refresh_from_db()
-        assert user2_restaurant_visit.visit_count == 1  # unchanged
-
-        user1_cuisine_stat.refresh_from_db()
-        assert user1_cuisine_stat.visit_count == 2
+        visits = dict(
+            UserRestaurantVisit.objects.filter(restaurant=restaurant).values_list(
+                "user_id", "visit_count"
+            )
+        )
+        assert visits[user1.id] == 2
+        assert visits[user2.id] == 1  # unchanged
 
-        user2_cuisine_stat.refresh_from_db()
-        assert user2_cuisine_stat.visit_count == 1  # unchanged
+        cuisine_stats = dict(
+            UserCuisineStat.objects.filter(cuisine=cuisine).values_list(
+                "user_id", "visit_count"
+            )
+        )
+        assert cuisine_stats[user1.id] == 2
+        assert cuisine_stats[user2.id] == 1  # unchanged
@@ -3,7 +3,7 @@ Test cases for restaurant recommendation API endpoints.
 """
 
 import pytest
-from unittest.mock import patch
+from unittest.mock import MagicMock
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework.test import APIClient
@@ -14,29 +14,51 @@ from apps.restaurants.models import (
     UserRestaurantVisit,
     UserCuisineStat,
 )
+from apps.restaurants.services import GooglePlacesService
 
 User = get_user_model()
 pytestmark = pytest.mark.django_db
 
+# Resolved once at import rather than in every test
+GOOD_URL = reverse("restaurants:restaurant-good-recommendations")
+CHEAP_URL = reverse("restaurants:restaurant-cheap-recommendations")
+CUISINE_MATCH_URL = reverse("restaurants:restaurant-cuisine-match-recommendations")
+ALL_URL = reverse("restaurants:restaurant-all-recommendations")
+
 
 class TestRecommendationAPIEndpoints:
     """Test cases for recommendation API endpoints."""
 
+    @pytest.fixture(autouse=True)
+    def mock_recommendations(self, monkeypatch):
+        """Stub Google Places lookups; tests set the results they need."""
+        mock = MagicMock(return_value=[])
+        monkeypatch.setattr(
+            GooglePlacesService, "get_recommendations_near_location", mock
+        )
+        return mock
+
+    @pytest.fixture(scope="class")
+    def api_client(self):
+        """API client reused by the whole class; fixtures set its user."""
+        return APIClient()
+
     @pytest.fixture
-    def authenticated_client(self):
+    def authenticated_client(self, api_client):
         """Create an authenticated API client."""
-        user = User.objects.create_user(email="test@example.com", password="test123")
-        client = APIClient()
-        client.force_authenticate(user=user)
-        return client, user
+        user = User.objects.create_user(
+            email="no-history@example.com", password="test123"
+        )
+        api_client.force_authenticate(user=user)
+        return api_client, user
 
-    @pytest.fixture
-    def setup_user_data(self, authenticated_client):
-        """Set up test data for the authenticated user."""
-        client, user = authenticated_client
+    @pytest.fixture(scope="class")
+    def user_with_history(self, shared_user, shared_italian_cuisine):
+        """Give the shared user visit history, once for the whole class."""
+        user = shared_user
 
         # Create cuisines
-        italian_cuisine = Cuisine.objects.create(name="Italian")
+        italian_cuisine = shared_italian_cuisine
         chinese_cuisine = Cuisine.objects.create(name="Chinese")
 
         # Create restaurants with coordinates
@@ -47,7 +69,6 @@ class TestRecommendationAPIEndpoints:
             latitude=40.7128,
             longitude=-74.0060,
         )
-        restaurant1.cuisines.set([italian_cuisine])
 
         restaurant2 = Restaurant.objects.create(
             place_id="place2",
@@ -56,37 +77,47 @@ class TestRecommendationAPIEndpoints:
             latitude=40.7589,
             longitude=-73.9851,
         )
-        restaurant2.cuisines.set([chinese_cuisine])
 
-        # Create visit history
-        UserRestaurantVisit.objects.create(
-            user=user, restaurant=restaurant1, visit_count=5
+        # Link cuisines with one INSERT; the restaurants have none yet
+        Through = Restaurant.cuisines.through
+        Through.objects.bulk_create(
+            [
+                Through(restaurant=restaurant1, cuisine=italian_cuisine),
+                Through(restaurant=restaurant2, cuisine=chinese_cuisine),
+            ]
         )
-        UserRestaurantVisit.objects.create(
-            user=user, restaurant=restaurant2, visit_count=3
+
+        # Create visit history
+        UserRestaurantVisit.objects.bulk_create(
+            [
+                UserRestaurantVisit(user=user, restaurant=restaurant1, visit_count=5),
+                UserRestaurantVisit(user=user, restaurant=restaurant2, visit_count=3),
+            ]
         )
 
         # Create cuisine stats
-        UserCuisineStat.objects.create(
-            user=user, cuisine=italian_cuisine, visit_count=5
-        )
-        UserCuisineStat.objects.create(
-            user=user, cuisine=chinese_cuisine, visit_count=3
+        UserCuisineStat.objects.bulk_create(
+            [
+                UserCuisineStat(user=user, cuisine=italian_cuisine, visit_count=5),
+                UserCuisineStat(user=user, cuisine=chinese_cuisine, visit_count=3),
+            ]
         )
 
-        return client, user
+        return user
 
-    @pytest.mark.integration
-    @patch(
-        "apps.restaurants.services.GooglePlacesService.get_recommendations_near_location"
-    )
-    def test_good_recommendations_endpoint(self, mock_recommendations, setup_user_data):
-        """Test the good recommendations API endpoint."""
-        client, user = setup_user_data
+    @pytest.fixture
+    def setup_user_data(self, api_client, user_with_history):
+        """Return an API client authenticated as the user with visit history."""
+        api_client.force_authenticate(user=user_with_history)
+        return api_client, user_with_history
 
-        # Mock the Google Places response
-        mock_recommendations.side_effect = [
-            [
+    @pytest.mark.integration
+    @pytest.mark.parametrize(
+        "rec_type, url, payload, context_keys",
+        [
+            (
+                "good",
+                GOOD_URL,
                 {
                     "place_id": "good1",
                     "name": "Excellent Restaurant",
@@ -94,41 +125,12 @@ class TestRecommendationAPIEndpoints:
                     "vicinity": "Near favorite spot",
                     "cuisines": ["Italian Restaurant"],
                     "business_status": "OPERATIONAL",
-                }
-            ],
-            [],  # No recommendations from second location
-        ]
-
-        url = reverse("restaurants:restaurant-good-recommendations")
-        response = client.get(url)
-
-        assert response.status_code == status.HTTP_200_OK
-        data = response.json()
-
-        assert data["recommendation_type"] == "good"
-        assert data["count"] == 1
-        assert len(data["recommendations"]) == 1
-        assert data["recommendations"][0]["name"] == "Excellent Restaurant"
-        assert data["recommendations"][0]["recommendation_type"] == "good"
-
-        # Check user context
-        assert "user_context" in data
-        assert "frequent_restaurants" in data["user_context"]
-        assert len(data["user_context"]["frequent_restaurants"]) > 0
-
-    @pytest.mark.integration
-    @patch(
-        "apps.restaurants.services.GooglePlacesService.get_recommendations_near_location"
-    )
-    def test_cheap_recommendations_endpoint(
-        self, mock_recommendations, setup_user_data
-    ):
-        """Test the cheap recommendations API endpoint."""
-        client, user = setup_user_data
-
-        # Mock the Google Places response
-        mock_recommendations.side_effect = [
-            [
+                },
+                ["frequent_restaurants"],
+            ),
+            (
+                "cheap",
+                CHEAP_URL,
                 {
                     "place_id": "cheap1",
                     "name": "Budget Eats",
@@ -137,36 +139,12 @@ class TestRecommendationAPIEndpoints:
                     "vicinity": "Affordable dining",
                     "cuisines": ["Restaurant"],
                     "business_status": "OPERATIONAL",
-                }
-            ],
-            [],
-        ]
-
-        url = reverse("restaurants:restaurant-cheap-recommendations")
-        response = client.get(url)
-
-        assert response.status_code == status.HTTP_200_OK
-        data = response.json()
-
-        assert data["recommendation_type"] == "cheap"
-        assert data["count"] == 1
-        assert len(data["recommendations"]) == 1
-        assert data["recommendations"][0]["name"] == "Budget Eats"
-        assert data["recommendations"][0]["recommendation_type"] == "cheap"
-
-    @pytest.mark.integration
-    @patch(
-        "apps.restaurants.services.GooglePlacesService.get_recommendations_near_location"
-    )
-    def test_cuisine_match_recommendations_endpoint(
-        self, mock_recommendations, setup_user_data
-    ):
-        """Test the cuisine match recommendations API endpoint."""
-        client, user = setup_user_data
-
-        # Mock the Google Places response
-        mock_recommendations.side_effect = [
-            [
+                },
+                ["frequent_restaurants"],
+            ),
+            (
+                "cuisine_match",
+                CUISINE_MATCH_URL,
                 {
                     "place_id": "match1",
                     "name": "New Italian Place",
@@ -174,41 +152,53 @@ class TestRecommendationAPIEndpoints:
                     "vicinity": "Italian cuisine",
                     "cuisines": ["Italian Restaurant", "Pizza Restaurant"],
                     "business_status": "OPERATIONAL",
-                }
-            ],
-            [],
-        ]
+                },
+                ["frequent_restaurants", "preferred_cuisines"],
+            ),
+        ],
+    )
+    def test_recommendations_endpoint(
+        self,
+        mock_recommendations,
+        setup_user_data,
+        rec_type,
+        url,
+        payload,
+        context_keys,
+    ):
+        """Test each single-type recommendations API endpoint."""
+        client, user = setup_user_data
+
+        # One result near the first location, none near the second
+        mock_recommendations.side_effect = [[dict(payload)], []]
 
-        url = reverse("restaurants:restaurant-cuisine-match-recommendations")
         response = client.get(url)
 
         assert response.status_code == status.HTTP_200_OK
         data = response.json()
 
-        assert data["recommendation_type"] == "cuisine_match"
+        assert data["recommendation_type"] == rec_type
         assert data["count"] == 1
         assert len(data["recommendations"]) == 1
-        assert data["recommendations"][0]["name"] == "New Italian Place"
-        assert data["recommendations"][0]["recommendation_type"] == "cuisine_match"
-        assert "matched_cuisines" in data["recommendations"][0]
+        assert data["recommendations"][0]["name"] == payload["name"]
+        assert data["recommendations"][0]["recommendation_type"] == rec_type
+        if rec_type == "cuisine_match":
+            assert "matched_cuisines" in data["recommendations"][0]
 
-        # Check user context includes preferred cuisines
+        # Check user context
         assert "user_context" in data
-        assert "preferred_cuisines" in data["user_context"]
-        assert len(data["user_context"]["preferred_cuisines"]) > 0
+        for key in context_keys:
+            assert len(data["user_context"][key]) > 0
 
     @pytest.mark.integration
-    @patch(
-        "apps.restaurants.services.GooglePlacesService.get_recommendations_near_location"
-    )
-    def test_all_recommendations_endpoint(self, mock_recommendations, setup_user_data):
+    def test_all_recommendations_endpoint(self, monkeypatch, setup_user_data):
         """Test the all recommendations API endpoint."""
         client, user = setup_user_data
 
-        # Mock the Google Places response
-        mock_recommendations.side_effect = [
-            # Good recommendations - first location
-            [
+        # Mock the Google Places response: one result per type, all near the
+        # most visited restaurant, none near the other
+        responses = {
+            "good": [
                 {
                     "place_id": "good1",
                     "name": "Great Place",
@@ -218,10 +208,7 @@ class TestRecommendationAPIEndpoints:
                     "business_status": "OPERATIONAL",
                 }
             ],
-            # Good recommendations - second location
-            [],
-            # Cheap recommendations - first location
-            [
+            "cheap": [
                 {
                     "place_id": "cheap1",
                     "name": "Budget Place",
@@ -232,10 +219,7 @@ class TestRecommendationAPIEndpoints:
                     "business_status": "OPERATIONAL",
                 }
             ],
-            # Cheap recommendations - second location
-            [],
-            # Cuisine match - first location
-            [
+            "cuisine_match": [
                 {
                     "place_id": "match1",
                     "name": "Italian Match",
@@ -245,12 +229,24 @@ class TestRecommendationAPIEndpoints:
                     "business_status": "OPERATIONAL",
                 }
             ],
-            # Cuisine match - second location
-            [],
-        ]
+        }
+
+        def recommendations_near(latitude, recommendation_types, **kwargs):
+            return {
+                recommendation_type: (
+                    responses[recommendation_type] if latitude == 40.7128 else []
+                )
+                for recommendation_type in recommendation_types
+            }
+
+        mock_recommendations = MagicMock(side_effect=recommendations_near)
+        monkeypatch.setattr(
+            GooglePlacesService,
+            "get_recommendations_by_type_near_location",
+            mock_recommendations,
+        )
 
-        url = reverse("restaurants:restaurant-all-recommendations")
-        response = client.get(url)
+        response = client.get(ALL_URL)
 
         assert response.status_code == status.HTTP_200_OK
         data = response.json()
@@ -271,31 +267,44 @@ class TestRecommendationAPIEndpoints:
         assert data["cheap"][0]["recommendation_type"] == "cheap"
         assert data["cuisine_match"][0]["recommendation_type"] == "cuisine_match"
 
+        # One Places lookup per frequent location covers every type
+        assert mock_recommendations.call_count == 2
+
     @pytest.mark.integration
     def test_recommendations_with_limit_parameter(self, setup_user_data):
         """Test recommendations endpoints with limit parameter."""
         client, user = setup_user_data
 
-        with patch(
-            "apps.restaurants.services.GooglePlacesService.get_recommendations_near_location"
-        ) as mock_rec:
-            mock_rec.return_value = []
+        # Test with custom limit
+        response = client.get(GOOD_URL, {"limit": 5})
 
-            # Test with custom limit
-            url = reverse("restaurants:restaurant-good-recommendations")
-            response = client.get(url, {"limit": 5})
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["count"] == 0  # No recommendations from mock
+
+    @pytest.mark.integration
+    @pytest.mark.parametrize("url", [GOOD_URL, ALL_URL])
+    @pytest.mark.parametrize(
+        "params", [{"limit": "abc"}, {"radius": 0}, {"search_limit": 1000}]
+    )
+    def test_recommendations_invalid_parameters(
+        self, authenticated_client, mock_recommendations, url, params
+    ):
+        """Test that invalid query parameters are rejected before any lookup."""
+        client, user = authenticated_client
+
+        response = client.get(url, params)
 
-            assert response.status_code == status.HTTP_200_OK
-            data = response.json()
-            assert data["count"] == 0  # No recommendations from mock
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert set(response.json()) == set(params)
+        mock_recommendations.assert_not_called()
 
     @pytest.mark.integration
     def test_recommendations_unauthenticated(self):
         """Test that recommendations require authentication."""
         client = APIClient()  # No authentication
 
-        url = reverse("restaurants:restaurant-good-recommendations")
-        response = client.get(url)
+        response = client.get(GOOD_URL)
 
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
 
@@ -304,8 +313,7 @@ class TestRecommendationAPIEndpoints:
         """Test recommendations when user has no visit history."""
         client, user = authenticated_client
 
-        url = reverse("restaurants:restaurant-good-recommendations")
-        response = client.get(url)
+        response = client.get(GOOD_URL)
 
         assert response.status_code == status.HTTP_200_OK
         data = response.json()
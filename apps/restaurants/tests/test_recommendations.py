@@ -15,57 +15,141 @@ from apps.restaurants.services.recommendations import RestaurantRecommendationSe
 from apps.restaurants.services import GooglePlacesService
 
 User = get_user_model()
-pytestmark = pytest.mark.django_db
 
 
+# Places results near each frequent location, in location order. Copied per
+# test because the service annotates the dicts it receives.
+GOOD_RESULTS = (
+    [
+        {
+            "place_id": "rec1",
+            "name": "Great Italian Place",
+            "rating": 4.5,
+            "vicinity": "Near User Favorite Italian",
+            "cuisines": ["Italian Restaurant"],
+        }
+    ],
+    [
+        {
+            "place_id": "rec2",
+            "name": "Excellent Chinese Restaurant",
+            "rating": 4.8,
+            "vicinity": "Near User Favorite Chinese",
+            "cuisines": ["Chinese Restaurant"],
+        }
+    ],
+)
+
+CHEAP_RESULTS = (
+    [
+        {
+            "place_id": "cheap1",
+            "name": "Budget Italian",
+            "rating": 3.8,
+            "price_level": 1,
+            "vicinity": "Near User Favorite Italian",
+            "cuisines": ["Italian Restaurant"],
+        }
+    ],
+    [
+        {
+            "place_id": "cheap2",
+            "name": "Budget Chinese",
+            "rating": 3.5,
+            "price_level": 1,
+            "vicinity": "Near User Favorite Chinese",
+            "cuisines": ["Chinese Restaurant"],
+        }
+    ],
+)
+
+CUISINE_MATCH_RESULTS = (
+    [
+        {
+            "place_id": "match1",
+            "name": "New Italian Spot",
+            "rating": 4.2,
+            "vicinity": "Near User Favorite Italian",
+            "cuisines": ["Italian Restaurant", "Pizza Restaurant"],
+        }
+    ],
+    [
+        {
+            "place_id": "match2",
+            "name": "New Chinese Spot",
+            "rating": 4.0,
+            "vicinity": "Near User Favorite Chinese",
+            "cuisines": ["Chinese Restaurant", "Asian Restaurant"],
+        }
+    ],
+)
+
+
+def _places_side_effect(results):
+    """Return fresh copies of per-location results for a mock side_effect."""
+    return [[dict(rec) for rec in location_results] for location_results in results]
+
+
+@pytest.mark.django_db
 class TestRestaurantRecommendationService:
     """Test cases for RestaurantRecommendationService."""
 
-    @pytest.fixture
-    def user(self):
-        """Create a test user."""
-        return User.objects.create_user(email="test@example.com", password="test123")
+    @pytest.fixture(scope="class")
+    def user(self, shared_user):
+        """Test user shared by the whole class."""
+        return shared_user
 
-    @pytest.fixture
+    @pytest.fixture(scope="class")
     def setup_user_data(self, user):
-        """Set up test data for the user."""
+        """Set up test data for the user, once for the whole class."""
         # Create cuisines
-        italian_cuisine = Cuisine.objects.create(name="Italian")
-        chinese_cuisine = Cuisine.objects.create(name="Chinese")
+        italian_cuisine, chinese_cuisine = Cuisine.objects.bulk_create(
+            [Cuisine(name="Italian"), Cuisine(name="Chinese")]
+        )
 
         # Create restaurants with coordinates
-        restaurant1 = Restaurant.objects.create(
-            place_id="place1",
-            name="User Favorite Italian",
-            address="123 Test St",
-            latitude=40.7128,
-            longitude=-74.0060,
+        restaurant1, restaurant2 = Restaurant.objects.bulk_create(
+            [
+                Restaurant(
+                    place_id="place1",
+                    name="User Favorite Italian",
+                    address="123 Test St",
+                    latitude=40.7128,
+                    longitude=-74.0060,
+                ),
+                Restaurant(
+                    place_id="place2",
+                    name="User Favorite Chinese",
+                    address="456 Test Ave",
+                    latitude=40.7589,
+                    longitude=-73.9851,
+                ),
+            ]
         )
-        restaurant1.cuisines.set([italian_cuisine])
-
-        restaurant2 = Restaurant.objects.create(
-            place_id="place2",
-            name="User Favorite Chinese",
-            address="456 Test Ave",
-            latitude=40.7589,
-            longitude=-73.9851,
+
+        # Link cuisines with one INSERT; the restaurants have none yet
+        Through = Restaurant.cuisines.through
+        Through.objects.bulk_create(
+            [
+                Through(restaurant=restaurant1, cuisine=italian_cuisine),
+                Through(restaurant=restaurant2, cuisine=chinese_cuisine),
+            ]
         )
-        restaurant2.cuisines.set([chinese_cuisine])
 
         # Create visit history
-        UserRestaurantVisit.objects.create(
-            user=user, restaurant=restaurant1, visit_count=5
-        )
-        UserRestaurantVisit.objects.create(
-            user=user, restaurant=restaurant2, visit_count=3
+        UserRestaurantVisit.objects.bulk_create(
+            [
+                UserRestaurantVisit(user=user, restaurant=restaurant1, visit_count=5),
+                UserRestaurantVisit(user=user, restaurant=restaurant2, visit_count=3),
+            ]
         )
 
         # Create cuisine stats
-        UserCuisineStat.objects.create(
-            user=user, cuisine=italian_cuisine, visit_count=5
-        )
-        UserCuisineStat.objects.create(
-            user=user, cuisine=chinese_cuisine, visit_count=3
+        UserCuisineStat.objects.bulk_create(
+            [
+                UserCuisineStat(user=user, cuisine=italian_cuisine, visit_count=5),
+                UserCuisineStat(user=user, cuisine=chinese_cuisine, visit_count=3),
+            ]
         )
 
         return {
@@ -99,35 +183,34 @@ class TestRestaurantRecommendationService:
         assert cuisines[1] == "Chinese"
 
     @pytest.mark.unit
+    @pytest.mark.parametrize(
+        "rec_type, method_name, results",
+        [
+            ("good", "get_good_restaurants_recommendations", GOOD_RESULTS),
+            ("cheap", "get_cheap_restaurants_recommendations", CHEAP_RESULTS),
+            (
+                "cuisine_match",
+                "get_cuisine_match_recommendations",
+                CUISINE_MATCH_RESULTS,
+            ),
+        ],
+    )
     @patch.object(GooglePlacesService, "get_recommendations_near_location")
-    def test_get_good_restaurants_recommendations(
-        self, mock_recommendations, user, setup_user_data
+    def test_get_recommendations(
+        self,
+        mock_recommendations,
+        user,
+        setup_user_data,
+        rec_type,
+        method_name,
+        results,
     ):
-        """Test getting good restaurant recommendations."""
+        """Test each single-type recommendation method."""
         # Mock the Google Places response with different results for each call
-        mock_recommendations.side_effect = [
-            [
-                {
-                    "place_id": "rec1",
-                    "name": "Great Italian Place",
-                    "rating": 4.5,
-                    "vicinity": "Near User Favorite Italian",
-                    "cuisines": ["Italian Restaurant"],
-                }
-            ],
-            [
-                {
-                    "place_id": "rec2",
-                    "name": "Excellent Chinese Restaurant",
-                    "rating": 4.8,
-                    "vicinity": "Near User Favorite Chinese",
-                    "cuisines": ["Chinese Restaurant"],
-                }
-            ],
-        ]
+        mock_recommendations.side_effect = _places_side_effect(results)
 
         service = RestaurantRecommendationService()
-        recommendations = service.get_good_restaurants_recommendations(user, limit=10)
+        recommendations = getattr(service, method_name)(user, limit=10)
 
         # Verify recommendations were returned
         assert len(recommendations) == 2  # 1 from each location
@@ -135,104 +218,84 @@ class TestRestaurantRecommendationService:
         # Verify mock was called with correct parameters
         assert mock_recommendations.call_count == 2  # Called for each frequent location
 
-        # Check first call (most visited restaurant)
-        first_call = mock_recommendations.call_args_list[0]
-        assert first_call[1]["latitude"] == 40.7128
-        assert first_call[1]["longitude"] == -74.0060
-        assert first_call[1]["recommendation_type"] == "good"
+        # Locations are fetched concurrently, so check calls regardless of order
+        called_locations = {
+            (call[1]["latitude"], call[1]["longitude"])
+            for call in mock_recommendations.call_args_list
+        }
+        assert called_locations == {(40.7128, -74.0060), (40.7589, -73.9851)}
+        for call in mock_recommendations.call_args_list:
+            assert call[1]["recommendation_type"] == rec_type
+            if rec_type == "cuisine_match":
+                assert "Italian" in call[1]["user_cuisines"]
+                assert "Chinese" in call[1]["user_cuisines"]
 
         # Verify recommendations have reference location info
         for rec in recommendations:
             assert "reference_location" in rec
-            assert "recommendation_type" in rec
-            assert rec["recommendation_type"] == "good"
+            assert rec["recommendation_type"] == rec_type
+            if rec_type == "cuisine_match":
+                assert "matched_cuisines" in rec
 
     @pytest.mark.unit
-    @patch.object(GooglePlacesService, "get_recommendations_near_location")
-    def test_get_cheap_restaurants_recommendations(
-        self, mock_recommendations, user, setup_user_data
-    ):
-        """Test getting cheap restaurant recommendations."""
-        mock_recommendations.side_effect = [
-            [
-                {
-                    "place_id": "cheap1",
-                    "name": "Budget Italian",
-                    "rating": 3.8,
-                    "price_level": 1,
-                    "vicinity": "Near User Favorite Italian",
-                    "cuisines": ["Italian Restaurant"],
-                }
-            ],
-            [
-                {
-                    "place_id": "cheap2",
-                    "name": "Budget Chinese",
-                    "rating": 3.5,
-                    "price_level": 1,
-                    "vicinity": "Near User Favorite Chinese",
-                    "cuisines": ["Chinese Restaurant"],
-                }
-            ],
-        ]
-
+    def test_no_frequent_locations(self):
+        """Test recommendations when user has no frequent locations."""
+        user = User.objects.create_user(
+            email="no-history@example.com", password="test123"
+        )
         service = RestaurantRecommendationService()
-        recommendations = service.get_cheap_restaurants_recommendations(user, limit=10)
 
-        assert len(recommendations) == 2  # 1 from each location
-        assert mock_recommendations.call_count == 2
+        recommendations = service.get_good_restaurants_recommendations(user)
+        assert recommendations == []
 
-        # Check recommendation type
-        first_call = mock_recommendations.call_args_list[0]
-        assert first_call[1]["recommendation_type"] == "cheap"
+        recommendations = service.get_cheap_restaurants_recommendations(user)
+        assert recommendations == []
 
-        # Verify recommendations have correct type
-        for rec in recommendations:
-            assert rec["recommendation_type"] == "cheap"
+        recommendations = service.get_cuisine_match_recommendations(user)
+        assert recommendations == []
 
     @pytest.mark.unit
-    @patch.object(GooglePlacesService, "get_recommendations_near_location")
-    def test_get_cuisine_match_recommendations(
-        self, mock_recommendations, user, setup_user_data
+    @patch.object(GooglePlacesService, "get_recommendations_by_type_near_location")
+    def test_get_all_recommendations(
+        self, mock_recommendations, django_assert_num_queries, user, setup_user_data
     ):
-        """Test getting cuisine-matching restaurant recommendations."""
-        mock_recommendations.side_effect = [
-            [
-                {
-                    "place_id": "match1",
-                    "name": "New Italian Spot",
-                    "rating": 4.2,
-                    "vicinity": "Near User Favorite Italian",
-                    "cuisines": ["Italian Restaurant", "Pizza Restaurant"],
-                }
-            ],
-            [
-                {
-                    "place_id": "match2",
-                    "name": "New Chinese Spot",
-                    "rating": 4.0,
-                    "vicinity": "Near User Favorite Chinese",
-                    "cuisines": ["Chinese Restaurant", "Asian Restaurant"],
-                }
-            ],
-        ]
+        """Test getting all recommendation types."""
+        result = {
+            "place_id": "test1",
+            "name": "Test Restaurant",
+            "rating": 4.0,
+            "vicinity": "Test Area",
+            "cuisines": ["Italian Restaurant"],
+        }
+        mock_recommendations.side_effect = lambda recommendation_types, **kwargs: {
+            recommendation_type: [dict(result)]
+            for recommendation_type in recommendation_types
+        }
 
         service = RestaurantRecommendationService()
-        recommendations = service.get_cuisine_match_recommendations(user, limit=10)
+        # One query for frequent locations and one for top cuisines
+        with django_assert_num_queries(2):
+            all_recommendations = service.get_all_recommendations(
+                user, limit_per_type=5
+            )
 
-        assert len(recommendations) == 2  # 1 from each location
+        assert "good" in all_recommendations
+        assert "cheap" in all_recommendations
+        assert "cuisine_match" in all_recommendations
+
+        # Each type should have recommendations
+        assert len(all_recommendations["good"]) > 0
+        assert len(all_recommendations["cheap"]) > 0
+        assert len(all_recommendations["cuisine_match"]) > 0
+
+        # One Places lookup per frequent location covers every type
         assert mock_recommendations.call_count == 2
+        for call in mock_recommendations.call_args_list:
+            assert call[1]["recommendation_types"] == ["good", "cheap", "cuisine_match"]
 
-        # Check recommendation type and cuisine matching
-        first_call = mock_recommendations.call_args_list[0]
-        assert first_call[1]["recommendation_type"] == "cuisine_match"
-        assert "Italian" in first_call[1]["user_cuisines"]
-        assert "Chinese" in first_call[1]["user_cuisines"]
 
-        # Verify recommendations have matched cuisines
-        for rec in recommendations:
-            assert rec["recommendation_type"] == "cuisine_match"
-            assert "matched_cuisines" in rec
+class TestRecommendationHelpers:
+    """Test cases for recommendation helpers that need no database."""
 
     @pytest.mark.unit
     def test_deduplicate_recommendations(self):
@@ -270,55 +333,34 @@ class TestRestaurantRecommendationService:
         assert "Italian Restaurant" in matching
 
     @pytest.mark.unit
-    def test_no_frequent_locations(self, user):
-        """Test recommendations when user has no frequent locations."""
+    def test_get_matching_cuisines_literal_and_empty(self):
+        """Test that cuisine names match literally and no preferences match nothing."""
         service = RestaurantRecommendationService()
 
-        recommendations = service.get_good_restaurants_recommendations(user)
-        assert recommendations == []
+        restaurant_cuisines = ["Bar & Grill", "Barbecue Restaurant"]
 
-        recommendations = service.get_cheap_restaurants_recommendations(user)
-        assert recommendations == []
+        matching = service._get_matching_cuisines(restaurant_cuisines, ["bar & grill"])
+        assert matching == ["Bar & Grill"]
 
-        recommendations = service.get_cuisine_match_recommendations(user)
-        assert recommendations == []
+        matching = service._get_matching_cuisines(restaurant_cuisines, ["a.b"])
+        assert matching == []
 
-    @pytest.mark.unit
-    @patch.object(GooglePlacesService, "get_recommendations_near_location")
-    def test_get_all_recommendations(self, mock_recommendations, user, setup_user_data):
-        """Test getting all recommendation types."""
-        mock_recommendations.return_value = [
-            {
-                "place_id": "test1",
-                "name": "Test Restaurant",
-                "rating": 4.0,
-                "vicinity": "Test Area",
-                "cuisines": ["Italian Restaurant"],
-            }
-        ]
-
-        service = RestaurantRecommendationService()
-        all_recommendations = service.get_all_recommendations(user, limit_per_type=5)
-
-        assert "good" in all_recommendations
-        assert "cheap" in all_recommendations
-        assert "cuisine_match" in all_recommendations
-
-        # Each type should have recommendations
-        assert len(all_recommendations["good"]) > 0
-        assert len(all_recommendations["cheap"]) > 0
-        assert len(all_recommendations["cuisine_match"]) > 0
+        assert service._get_matching_cuisines(restaurant_cuisines, []) == []
 
 
 class TestGooglePlacesServiceExtensions:
     """Test cases for extended Google Places service functionality."""
 
+    @pytest.fixture
+    def mock_client(self):
+        """Google Maps client stub; the service accepts it directly."""
+        client = Mock()
+        client.places_nearby.return_value = {"results": []}
+        return client
+
     @pytest.mark.unit
-    @patch("googlemaps.Client")
-    def test_search_nearby_restaurants(self, mock_client_class):
+    def test_search_nearby_restaurants(self, mock_client):
         """Test searching for nearby restaurants with filters."""
-        # Mock the Google Maps client
-        mock_client = Mock()
         mock_client.places_nearby.return_value = {
             "results": [
                 {
@@ -343,7 +385,6 @@ class TestGooglePlacesServiceExtensions:
                 },
             ]
         }
-        mock_client_class.return_value = mock_client
         service = GooglePlacesService(client=mock_client)
 
         # Test filtering by rating
@@ -364,11 +405,12 @@ class TestGooglePlacesServiceExtensions:
         assert results[0]["name"] == "Cheap Eats"
         assert results[0]["price_level"] == 1
 
+        # The second search reuses the cached nearby results
+        mock_client.places_nearby.assert_called_once()
+
     @pytest.mark.unit
-    @patch("googlemaps.Client")
-    def test_get_recommendations_near_location(self, mock_client_class):
+    def test_get_recommendations_near_location(self, mock_client):
         """Test getting recommendations near a specific location."""
-        mock_client = Mock()
         mock_client.places_nearby.return_value = {
             "results": [
                 {
@@ -382,8 +424,6 @@ class TestGooglePlacesServiceExtensions:
                 }
             ]
         }
-        mock_client_class.return_value = mock_client
-
         service = GooglePlacesService(client=mock_client)
 
         # Test 'good' recommendations
@@ -398,3 +438,38 @@ class TestGooglePlacesServiceExtensions:
         mock_client.places_nearby.assert_called_with(
             location=(40.7128, -74.0060), radius=2000, type="restaurant"
         )
+
+    @pytest.mark.unit
+    def test_get_recommendations_by_type_near_location(self, mock_client):
+        """Test that one nearby search is filtered for every recommendation type."""
+        mock_client.places_nearby.return_value = {
+            "results": [
+                {
+                    "place_id": "good_place",
+                    "name": "Excellent Restaurant",
+                    "rating": 4.8,
+                    "price_level": 3,
+                    "types": ["restaurant"],
+                },
+                {
+                    "place_id": "cheap_place",
+                    "name": "Cheap Eats",
+                    "rating": 3.5,
+                    "price_level": 1,
+                    "types": ["restaurant"],
+                },
+            ]
+        }
+        service = GooglePlacesService(client=mock_client)
+
+        results = service.get_recommendations_by_type_near_location(
+            latitude=40.7128,
+            longitude=-74.0060,
+            recommendation_types=["good", "cheap"],
+        )
+
+        assert [rec["name"] for rec in results["good"]] == ["Excellent Restaurant"]
+        assert [rec["name"] for rec in results["cheap"]] == ["Cheap Eats"]
+        mock_client.places_nearby.assert_called_once_with(
+            location=(40.7128, -74.0060), radius=2000, type="restaurant"
+        )
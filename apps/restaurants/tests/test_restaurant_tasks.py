@@ -1,24 +1,80 @@
+import types
 import uuid
 from decimal import Decimal
+from typing import Dict, Optional
 from unittest.mock import patch, MagicMock
-from django.test import TestCase
-from django.utils import timezone
-from celery.result import AsyncResult
+
+import googlemaps
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
 
 from apps.restaurants.models import Restaurant, Cuisine
 from apps.restaurants.tasks import (
+    PLACES_ACTIVE_CALLS_KEY,
+    PLACES_ACTIVE_CALLS_TTL,
+    _places_call_slot,
     update_restaurant_info,
     update_all_restaurants,
     create_restaurant_from_places_data,
 )
-from apps.restaurants.services import GooglePlacesService
+from apps.restaurants.services import (
+    CircuitBreaker,
+    CircuitBreakerOpen,
+    GooglePlacesService,
+    places_circuit_breaker,
+)
+
+# Google Places details returned for the fixture restaurant; read-only so
+# that tests cannot change it for each other
+MOCK_PLACES_DATA = types.MappingProxyType(
+    {
+        "place_id": "ChIJN1t_tDeuEmsRUsoyG83frY4",
+        "name": "Updated Restaurant Name",
+        "address": "456 Updated Street, Test City",
+        "latitude": 40.7500,
+        "longitude": -74.0100,
+        "cuisines": ["French Restaurant"],
+        "rating": Decimal("4.8"),
+        "business_status": "OPERATIONAL",
+    }
+)
+
+# Google Place types and the cuisines extracted from them
+EXTRACT_CUISINES_CASES = (
+    # Specific cuisine types
+    (
+        ["restaurant", "italian_restaurant", "food"],
+        ["Restaurant", "Italian Restaurant"],
+    ),
+    # Multiple specific cuisines
+    (
+        ["pizza_restaurant", "italian_restaurant", "fast_food_restaurant"],
+        ["Pizza Restaurant", "Italian Restaurant", "Fast Food Restaurant"],
+    ),
+    # Generic restaurant type
+    (["restaurant", "food", "establishment"], ["Restaurant"]),
+    # No restaurant types
+    (["store", "establishment"], []),
+)
+
+
+class FakeGooglePlacesService:
+    """Stand-in for GooglePlacesService that returns canned place details."""
+
+    def __init__(self, details: Optional[Dict] = None):
+        self._details = details
+
+    def fetch_restaurant_details(self, place_id: str) -> Optional[Dict]:
+        # A fresh dict per call, like the real service
+        return None if self._details is None else dict(self._details)
 
 
 class RestaurantTasksTest(TestCase):
     """Test cases for restaurant Celery tasks."""
 
-    def setUp(self):
-        self.restaurant = Restaurant.objects.create(
+    @classmethod
+    def setUpTestData(cls):
+        cls.restaurant = Restaurant.objects.create(
             place_id="ChIJN1t_tDeuEmsRUsoyG83frY4",
             name="Test Restaurant",
             address="123 Test Street, Test City",
@@ -26,28 +82,26 @@ class RestaurantTasksTest(TestCase):
             longitude=-74.0060,
             rating=Decimal("4.5"),
         )
-        # Add cuisine to the restaurant
+        # Add cuisine to the restaurant; a direct link insert skips the
+        # lookup and delete that cuisines.set() does first
         italian_cuisine = Cuisine.objects.create(name="Italian")
-        self.restaurant.cuisines.set([italian_cuisine])
-
-        self.mock_places_data = {
-            "place_id": "ChIJN1t_tDeuEmsRUsoyG83frY4",
-            "name": "Updated Restaurant Name",
-            "address": "456 Updated Street, Test City",
-            "latitude": 40.7500,
-            "longitude": -74.0100,
-            "cuisines": ["French Restaurant"],
-            "rating": Decimal("4.8"),
-            "business_status": "OPERATIONAL",
-        }
-
-    @patch("apps.restaurants.tasks.GooglePlacesService")
-    def test_update_restaurant_info_success(self, mock_service_class):
+        Restaurant.cuisines.through.objects.create(
+            restaurant=cls.restaurant, cuisine=italian_cuisine
+        )
+
+    def _use_fake_service(self, details):
+        """Patch the tasks' Places service with a fake for this test."""
+        patcher = patch(
+            "apps.restaurants.tasks.get_places_service",
+            return_value=FakeGooglePlacesService(details),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_update_restaurant_info_success(self):
         """Test successful restaurant info update."""
-        # Mock the service
-        mock_service = MagicMock()
-        mock_service.fetch_restaurant_details.return_value = self.mock_places_data
-        mock_service_class.return_value = mock_service
+        # Fake the service
+        self._use_fake_service(MOCK_PLACES_DATA)
 
         # Call the task
         result = update_restaurant_info(str(self.restaurant.id))
@@ -55,22 +109,76 @@ class RestaurantTasksTest(TestCase):
         # Verify the result
         self.assertEqual(result["status"], "success")
         self.assertEqual(result["restaurant_id"], str(self.restaurant.id))
-        self.assertIn("name", result["updated_fields"])
-        self.assertIn("address", result["updated_fields"])
+        self.assertGreaterEqual(
+            set(result["updated_fields"]), {"name", "address", "cuisines"}
+        )
 
         # Verify the restaurant was updated
-        self.restaurant.refresh_from_db()
+        self.restaurant.refresh_from_db(fields=["name", "rating"])
         self.assertEqual(self.restaurant.name, "Updated Restaurant Name")
-        self.assertIn("cuisines", result["updated_fields"])
         self.assertEqual(self.restaurant.rating, Decimal("4.8"))
 
-    @patch("apps.restaurants.tasks.GooglePlacesService")
-    def test_update_restaurant_info_no_data(self, mock_service_class):
+    def test_update_restaurant_info_float_rating_unchanged(self):
+        """Test that a float rating equal to the stored Decimal is not an update."""
+        # 4.3 has no exact float representation, unlike the fixture's 4.5
+        Restaurant.objects.filter(id=self.restaurant.id).update(rating=Decimal("4.3"))
+
+        self._use_fake_service(
+            {
+                **MOCK_PLACES_DATA,
+                "rating": 4.3,
+            }
+        )
+
+        result = update_restaurant_info(str(self.restaurant.id))
+
+        self.assertEqual(result["status"], "success")
+        self.assertNotIn("rating", result["updated_fields"])
+
+    def test_update_restaurant_info_unchanged_skips_save(self):
+        """Test that nothing is written when Google Places data is unchanged."""
+        self._use_fake_service(
+            {
+                "place_id": self.restaurant.place_id,
+                "name": self.restaurant.name,
+                "address": self.restaurant.address,
+                "latitude": self.restaurant.latitude,
+                "longitude": self.restaurant.longitude,
+                "cuisines": ["Italian"],
+                "rating": 4.5,
+            }
+        )
+        original_updated_at = self.restaurant.updated_at
+
+        result = update_restaurant_info(str(self.restaurant.id))
+
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(result["updated_fields"], [])
+        self.restaurant.refresh_from_db(fields=["updated_at"])
+        self.assertEqual(self.restaurant.updated_at, original_updated_at)
+
+    def test_update_restaurant_info_same_payload_short_circuits(self):
+        """Test that an identical Places payload skips the diff on the next run."""
+        self._use_fake_service(MOCK_PLACES_DATA)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first = update_restaurant_info(str(self.restaurant.id))
+        self.assertEqual(first["status"], "success")
+
+        # A manual edit is left alone while the fingerprint is still valid
+        Restaurant.objects.filter(id=self.restaurant.id).update(name="Edited")
+        with self.assertNumQueries(2):
+            second = update_restaurant_info(str(self.restaurant.id))
+
+        self.assertEqual(second["status"], "unchanged")
+        self.assertEqual(second["updated_fields"], [])
+        self.restaurant.refresh_from_db(fields=["name"])
+        self.assertEqual(self.restaurant.name, "Edited")
+
+    def test_update_restaurant_info_no_data(self):
         """Test restaurant update when no data is returned from Google Places."""
-        # Mock the service to return None
-        mock_service = MagicMock()
-        mock_service.fetch_restaurant_details.return_value = None
-        mock_service_class.return_value = mock_service
+        # Fake the service to return None
+        self._use_fake_service(None)
 
         # Call the task
         result = update_restaurant_info(str(self.restaurant.id))
@@ -79,6 +187,39 @@ class RestaurantTasksTest(TestCase):
         self.assertEqual(result["status"], "error")
         self.assertIn("Failed to fetch data", result["message"])
 
+    @patch("apps.restaurants.tasks.update_restaurant_info.apply_async")
+    @patch("apps.restaurants.tasks.get_places_service")
+    def test_update_restaurant_info_circuit_open(
+        self, mock_get_places_service, mock_apply_async
+    ):
+        """Test that an open circuit breaker defers the update instead of retrying."""
+        mock_service = MagicMock(spec=GooglePlacesService)
+        mock_service.fetch_restaurant_details.side_effect = CircuitBreakerOpen()
+        mock_get_places_service.return_value = mock_service
+
+        result = update_restaurant_info(str(self.restaurant.id))
+
+        self.assertEqual(result["status"], "deferred")
+        mock_apply_async.assert_called_once()
+        self.assertEqual(
+            mock_apply_async.call_args.kwargs["args"], [str(self.restaurant.id)]
+        )
+        self.assertGreaterEqual(mock_apply_async.call_args.kwargs["countdown"], 60)
+
+    @override_settings(GOOGLE_PLACES_MAX_CONCURRENT_CALLS=0)
+    @patch("apps.restaurants.tasks.update_restaurant_info.apply_async")
+    @patch("apps.restaurants.tasks.get_places_service")
+    def test_update_restaurant_info_bulkhead_full(
+        self, mock_get_places_service, mock_apply_async
+    ):
+        """Test that the update is deferred when no Places call slot is free."""
+        result = update_restaurant_info(str(self.restaurant.id))
+
+        self.assertEqual(result["status"], "deferred")
+        mock_get_places_service.return_value.fetch_restaurant_details.assert_not_called()
+        mock_apply_async.assert_called_once()
+        self.assertEqual(cache.get(PLACES_ACTIVE_CALLS_KEY), 0)
+
     def test_update_restaurant_info_not_found(self):
         """Test restaurant update when restaurant doesn't exist."""
         non_existent_id = str(uuid.uuid4())
@@ -90,11 +231,16 @@ class RestaurantTasksTest(TestCase):
         self.assertEqual(result["status"], "error")
         self.assertIn("Restaurant not found", result["message"])
 
-    @patch("apps.restaurants.tasks.update_restaurant_info.delay")
-    def test_update_all_restaurants(self, mock_update_task):
+    @patch("apps.restaurants.tasks.group")
+    def test_update_all_restaurants(self, mock_group):
         """Test update all restaurants task."""
+        mock_group.return_value.apply_async.return_value.results = [
+            MagicMock(id="task-1"),
+            MagicMock(id="task-2"),
+        ]
+
         # Create another restaurant
-        Restaurant.objects.create(
+        another_restaurant = Restaurant.objects.create(
             place_id="ChIJAnother_place_id",
             name="Another Restaurant",
             address="789 Another Street",
@@ -106,15 +252,76 @@ class RestaurantTasksTest(TestCase):
         # Verify the result
         self.assertEqual(result["status"], "success")
         self.assertEqual(result["total_processed"], 2)
-        self.assertEqual(mock_update_task.call_count, 2)
+        self.assertEqual(result["task_ids"], ["task-1", "task-2"])
+
+        # All updates are dispatched through a single group
+        signatures = list(mock_group.call_args[0][0])
+        self.assertEqual(len(signatures), 2)
+        self.assertEqual(
+            {signature.args[0] for signature in signatures},
+            {str(self.restaurant.id), str(another_restaurant.id)},
+        )
+        mock_group.return_value.apply_async.assert_called_once_with()
+
+    @patch("apps.restaurants.tasks.get_places_service")
+    @patch("apps.restaurants.tasks.group")
+    def test_update_all_restaurants_skips_pending(
+        self, mock_group, mock_get_places_service
+    ):
+        """Test that restaurants with an update still queued are not queued again."""
+        mock_get_places_service.return_value.fetch_restaurant_details.return_value = (
+            None
+        )
+        mock_group.return_value.apply_async.return_value.results = [
+            MagicMock(id="task-1")
+        ]
+
+        first = update_all_restaurants()
+        second = update_all_restaurants()
+
+        self.assertEqual(first["total_processed"], 1)
+        self.assertEqual(second["total_processed"], 0)
+        self.assertEqual(second["skipped"], 1)
+        mock_group.assert_called_once()
+
+        # Running the update clears the pending marker
+        update_restaurant_info(str(self.restaurant.id))
+        third = update_all_restaurants()
+        self.assertEqual(third["skipped"], 0)
+
+    @override_settings(GOOGLE_PLACES_MAX_CONCURRENT_CALLS=0)
+    @patch("apps.restaurants.tasks.update_restaurant_info.apply_async")
+    @patch("apps.restaurants.tasks.group")
+    def test_update_all_restaurants_skips_deferred(self, mock_group, mock_apply_async):
+        """Test that a deferred update still counts as pending."""
+        mock_group.return_value.apply_async.return_value.results = [
+            MagicMock(id="task-1")
+        ]
+
+        update_all_restaurants()
+        result = update_restaurant_info(str(self.restaurant.id))
+        second = update_all_restaurants()
+
+        self.assertEqual(result["status"], "deferred")
+        mock_apply_async.assert_called_once()
+        self.assertEqual(second["total_processed"], 0)
+        self.assertEqual(second["skipped"], 1)
+
+    @patch("apps.restaurants.tasks.group")
+    def test_update_all_restaurants_empty(self, mock_group):
+        """Test update all restaurants task when there is nothing to update."""
+        Restaurant.objects.all().delete()
+
+        result = update_all_restaurants()
+
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(result["total_processed"], 0)
+        mock_group.assert_not_called()
 
-    @patch("apps.restaurants.tasks.GooglePlacesService")
-    def test_create_restaurant_from_places_data_success(self, mock_service_class):
+    def test_create_restaurant_from_places_data_success(self):
         """Test creating restaurant from Google Places data."""
-        # Mock the service
-        mock_service = MagicMock()
-        mock_service.fetch_restaurant_details.return_value = self.mock_places_data
-        mock_service_class.return_value = mock_service
+        # Fake the service
+        self._use_fake_service(MOCK_PLACES_DATA)
 
         # Call the task
         place_id = "ChIJNew_place_id"
@@ -128,13 +335,30 @@ class RestaurantTasksTest(TestCase):
         self.assertEqual(restaurant.place_id, place_id)
         self.assertEqual(restaurant.name, "Updated Restaurant Name")  # From mock data
 
-    @patch("apps.restaurants.tasks.GooglePlacesService")
-    def test_create_restaurant_from_places_data_fallback(self, mock_service_class):
+    def test_create_restaurant_from_places_data_reuses_cuisines(self):
+        """Test that existing cuisines are reused and missing ones created."""
+        self._use_fake_service(
+            {
+                **MOCK_PLACES_DATA,
+                "cuisines": ["Italian", "French Restaurant"],
+            }
+        )
+
+        result = create_restaurant_from_places_data(
+            "ChIJNew_place_id", "Fallback Name", "Fallback Address"
+        )
+
+        restaurant = Restaurant.objects.get(id=result)
+        self.assertEqual(
+            set(restaurant.cuisines.values_list("name", flat=True)),
+            {"Italian", "French Restaurant"},
+        )
+        self.assertEqual(Cuisine.objects.filter(name="Italian").count(), 1)
+
+    def test_create_restaurant_from_places_data_fallback(self):
         """Test creating restaurant with fallback data when Google Places fails."""
-        # Mock the service to return None
-        mock_service = MagicMock()
-        mock_service.fetch_restaurant_details.return_value = None
-        mock_service_class.return_value = mock_service
+        # Fake the service to return None
+        self._use_fake_service(None)
 
         # Call the task
         place_id = "ChIJNew_place_id"
@@ -160,46 +384,66 @@ class RestaurantTasksTest(TestCase):
         self.assertEqual(result, str(self.restaurant.id))
 
         # Should not create a new restaurant
-        self.assertEqual(Restaurant.objects.count(), 1)
+        self.assertFalse(Restaurant.objects.exclude(pk=self.restaurant.pk).exists())
+
+
+class PlacesCallSlotTest(SimpleTestCase):
+    """Test cases for the Google Places call bulkhead."""
 
+    def test_counter_expires_while_slot_held(self):
+        """Test that an expired counter counts as zero instead of failing."""
+        with _places_call_slot():
+            cache.delete(PLACES_ACTIVE_CALLS_KEY)
 
-class GooglePlacesServiceTest(TestCase):
+        self.assertIsNone(cache.get(PLACES_ACTIVE_CALLS_KEY))
+
+    def test_counter_restarted_while_slot_held(self):
+        """Test that releasing a slot from before a restart stays at zero."""
+        with _places_call_slot():
+            cache.delete(PLACES_ACTIVE_CALLS_KEY)
+            with _places_call_slot():
+                self.assertEqual(cache.get(PLACES_ACTIVE_CALLS_KEY), 1)
+
+        self.assertEqual(cache.get(PLACES_ACTIVE_CALLS_KEY), 0)
+
+    def test_acquire_refreshes_ttl(self):
+        """Test that every acquire keeps the counter from expiring."""
+        with patch.object(cache, "touch", wraps=cache.touch) as mock_touch:
+            with _places_call_slot(), _places_call_slot():
+                pass
+
+        self.assertEqual(mock_touch.call_count, 2)
+        mock_touch.assert_called_with(PLACES_ACTIVE_CALLS_KEY, PLACES_ACTIVE_CALLS_TTL)
+
+
+class GooglePlacesServiceTest(SimpleTestCase):
     """Test cases for Google Places service."""
 
-    def setUp(self):
-        self.service = GooglePlacesService()
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Cuisine extraction never calls the client, so a mock one skips the
+        # API key lookup; the fetch tests build their own service
+        cls.service = GooglePlacesService(client=MagicMock())
+
+    def _make_mock_client(self, status, result):
+        """Return a mock Google Maps client whose place lookup gives one response."""
+        mock_client = MagicMock()
+        mock_client.place.return_value = {"status": status, "result": result}
+        return mock_client
 
     def test_extract_cuisines_from_types(self):
         """Test cuisine extraction from Google Place types."""
-        # Test specific cuisine types
-        types = ["restaurant", "italian_restaurant", "food"]
-        cuisines = self.service._extract_cuisines_from_types(types)
-        self.assertEqual(cuisines, ["Restaurant", "Italian Restaurant"])
-
-        # Test multiple specific cuisines
-        types = ["pizza_restaurant", "italian_restaurant", "fast_food_restaurant"]
-        cuisines = self.service._extract_cuisines_from_types(types)
-        expected = ["Pizza Restaurant", "Italian Restaurant", "Fast Food Restaurant"]
-        self.assertEqual(sorted(cuisines), sorted(expected))
-
-        # Test generic restaurant type
-        types = ["restaurant", "food", "establishment"]
-        cuisines = self.service._extract_cuisines_from_types(types)
-        self.assertEqual(cuisines, ["Restaurant"])
-
-        # Test no restaurant types
-        types = ["store", "establishment"]
-        cuisines = self.service._extract_cuisines_from_types(types)
-        self.assertEqual(cuisines, [])
-
-    @patch("googlemaps.Client")
-    def test_fetch_restaurant_details_success(self, mock_client_class):
+        for place_types, expected in EXTRACT_CUISINES_CASES:
+            with self.subTest(place_types=place_types):
+                cuisines = self.service._extract_cuisines_from_types(place_types)
+                self.assertEqual(cuisines, expected)
+
+    def test_fetch_restaurant_details_success(self):
         """Test successful restaurant details fetch."""
-        # Mock the Google Maps client
-        mock_client = MagicMock()
-        mock_client.place.return_value = {
-            "status": "OK",
-            "result": {
+        mock_client = self._make_mock_client(
+            "OK",
+            {
                 "place_id": "ChIJN1t_tDeuEmsRUsoyG83frY4",
                 "name": "Test Restaurant",
                 "formatted_address": "123 Test Street, Test City",
@@ -208,10 +452,7 @@ class GooglePlacesServiceTest(TestCase):
                 "types": ["restaurant", "italian_restaurant"],
                 "business_status": "OPERATIONAL",
             },
-        }
-        mock_client_class.return_value = mock_client
-
-        # Create service with mocked client
+        )
         service = GooglePlacesService(client=mock_client)
 
         # Fetch details
@@ -221,21 +462,80 @@ class GooglePlacesServiceTest(TestCase):
         self.assertIsNotNone(result)
         self.assertEqual(result["name"], "Test Restaurant")
         self.assertEqual(result["cuisines"], ["Restaurant", "Italian Restaurant"])
-        self.assertEqual(result["rating"], Decimal("4.5"))
+        self.assertEqual(result["rating"], 4.5)
 
-    @patch("googlemaps.Client")
-    def test_fetch_restaurant_details_api_error(self, mock_client_class):
+    def test_fetch_restaurant_details_api_error(self):
         """Test handling of Google Places API errors."""
-        # Mock the Google Maps client to return error
-        mock_client = MagicMock()
-        mock_client.place.return_value = {"status": "NOT_FOUND", "result": {}}
-        mock_client_class.return_value = mock_client
-
-        # Create service with mocked client
-        service = GooglePlacesService()
+        service = GooglePlacesService(client=self._make_mock_client("NOT_FOUND", {}))
 
         # Fetch details
         result = service.fetch_restaurant_details("ChIJInvalid_place_id")
 
         # Should return None for errors
         self.assertIsNone(result)
+
+
+class CircuitBreakerTest(SimpleTestCase):
+    """Test cases for the Google Places circuit breaker."""
+
+    def setUp(self):
+        self.breaker = CircuitBreaker("Test", failure_threshold=2, reset_timeout=60)
+        self.failing = MagicMock(side_effect=RuntimeError("boom"))
+
+    def _fail(self):
+        with self.assertRaises(RuntimeError):
+            self.breaker.call(self.failing)
+
+    def test_opens_after_threshold(self):
+        """Test that consecutive failures open the breaker and reject calls."""
+        self._fail()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self._fail()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+        with self.assertRaises(CircuitBreakerOpen):
+            self.breaker.call(self.failing)
+        self.assertEqual(self.failing.call_count, 2)
+
+    def test_success_resets_failures(self):
+        """Test that a success between failures keeps the breaker closed."""
+        self._fail()
+        self.assertEqual(self.breaker.call(lambda: "ok"), "ok")
+        self._fail()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    @patch("time.monotonic")
+    def test_half_open_trial(self, mock_monotonic):
+        """Test that one trial call is allowed after the reset timeout."""
+        mock_monotonic.return_value = 1000
+        self._fail()
+        self._fail()
+
+        mock_monotonic.return_value = 1060
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self._fail()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+        mock_monotonic.return_value = 1120
+        self.assertEqual(self.breaker.call(lambda: "ok"), "ok")
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_places_breaker_ignores_request_errors(self):
+        """Test that Places errors about the request do not open the breaker."""
+        breaker = CircuitBreaker(
+            "Test", failure_threshold=2, is_failure=places_circuit_breaker.is_failure
+        )
+        not_found = MagicMock(side_effect=googlemaps.exceptions.ApiError("NOT_FOUND"))
+
+        for _ in range(3):
+            with self.assertRaises(googlemaps.exceptions.ApiError):
+                breaker.call(not_found)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+        for exc in (
+            googlemaps.exceptions.Timeout(),
+            googlemaps.exceptions.HTTPError(503),
+        ):
+            with self.assertRaises(type(exc)):
+                breaker.call(MagicMock(side_effect=exc))
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
@@ -1,181 +1,306 @@
 import uuid
 from decimal import Decimal
+from unittest.mock import patch
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
-from rest_framework.authtoken.models import Token
 
 from apps.restaurants.models import Restaurant, Cuisine
+from apps.restaurants.pagination import RestaurantCursorPagination
 
 User = get_user_model()
 
+LIST_URL = reverse("restaurants:restaurant-list")
+
 
 class RestaurantAPITest(APITestCase):
     """Test cases for Restaurant API endpoints."""
 
-    def setUp(self):
-        self.user = User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        # Shared rows are created once per class; each test runs in a
+        # savepoint, so changes made by one test are rolled back
+        cls.user = User.objects.create_user(
             email="test@example.com",
             password="testpass123",
             first_name="Test",
             last_name="User",
         )
-        self.token = Token.objects.create(user=self.user)
-        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+
+        (
+            cls.italian_cuisine,
+            cls.french_cuisine,
+            cls.american_cuisine,
+        ) = Cuisine.objects.bulk_create(
+            [Cuisine(name="Italian"), Cuisine(name="French"), Cuisine(name="American")]
+        )
+
+        cls.restaurant = Restaurant.objects.create(
+            place_id="ChIJN1t_tDeuEmsRUsoyG83frY4",
+            name="Test Restaurant",
+            address="123 Test Street, Test City",
+            latitude=40.7128,
+            longitude=-74.0060,
+            rating=Decimal("4.5"),
+        )
+        Restaurant.cuisines.through.objects.create(
+            restaurant=cls.restaurant, cuisine=cls.french_cuisine
+        )
+        cls.detail_url = reverse(
+            "restaurants:restaurant-detail", args=[cls.restaurant.id]
+        )
+
+    def setUp(self):
+        # Authenticate without a token row or a token lookup per request
+        self.client.force_authenticate(user=self.user)
 
         self.restaurant_data = {
             "place_id": "ChIJN1t_tDeuEmsRUsoyG83frY4",
-            "name": "Test Restaurant",
-            "address": "123 Test Street, Test City",
+            "name": "New Restaurant",
+            "address": "789 New Street, Test City",
             "latitude": 40.7128,
             "longitude": -74.0060,
             "rating": "4.5",
         }
-        self.italian_cuisine = Cuisine.objects.create(name="Italian")
-        self.french_cuisine = Cuisine.objects.create(name="French")
+
+    def _bulk_create_restaurants(self, *rows):
+        """Create restaurants from (fields, cuisine) pairs with two queries."""
+        restaurants = Restaurant.objects.bulk_create(
+            [Restaurant(**fields) for fields, _ in rows]
+        )
+        Restaurant.cuisines.through.objects.bulk_create(
+            [
+                Restaurant.cuisines.through(restaurant=restaurant, cuisine=cuisine)
+                for restaurant, (_, cuisine) in zip(restaurants, rows)
+            ]
+        )
+        return restaurants
+
+    def _walk_pages(self, url):
+        """Follow next links two restaurants at a time; return the ids seen."""
+        seen = []
+        with patch.object(RestaurantCursorPagination, "page_size", 2):
+            while url:
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertNotIn("count", response.data)
+                seen.extend(r["id"] for r in response.data["results"])
+                url = response.data["next"]
+        return seen
 
     def test_create_restaurant(self):
         """Test creating a restaurant via API."""
-        url = "/api/v1/restaurants/"
-        response = self.client.post(url, self.restaurant_data, format="json")
+        response = self.client.post(LIST_URL, self.restaurant_data, format="json")
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        self.assertEqual(Restaurant.objects.count(), 1)
-        restaurant = Restaurant.objects.first()
-        self.assertEqual(restaurant.name, "Test Restaurant")
+        self.assertEqual(Restaurant.objects.count(), 2)
+        restaurant = Restaurant.objects.get(id=response.data["id"])
+        self.assertEqual(restaurant.name, "New Restaurant")
 
     def test_list_restaurants(self):
         """Test listing restaurants."""
-        restaurant = Restaurant.objects.create(
-            place_id="ChIJN1t_tDeuEmsRUsoyG83frY4",
-            name="Test Restaurant",
-            address="123 Test Street, Test City",
-            latitude=40.7128,
-            longitude=-74.0060,
-            rating=Decimal("4.5"),
-        )
-        restaurant.cuisines.set([self.italian_cuisine])
-
-        url = "/api/v1/restaurants/"
-        response = self.client.get(url)
+        response = self.client.get(LIST_URL)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data["results"]), 1)
         self.assertEqual(response.data["results"][0]["name"], "Test Restaurant")
 
-    def test_retrieve_restaurant(self):
-        """Test retrieving a specific restaurant."""
-        restaurant = Restaurant.objects.create(
-            place_id="ChIJN1t_tDeuEmsRUsoyG83frY4",
-            name="Test Restaurant",
-            address="123 Test Street, Test City",
-            latitude=40.7128,
-            longitude=-74.0060,
-            rating=Decimal("4.5"),
+    def test_list_restaurants_query_count(self):
+        """Test that listing does not issue a cuisine query per restaurant."""
+        self._bulk_create_restaurants(
+            *(
+                (
+                    {"place_id": f"place{i}", "name": f"Restaurant {i}"},
+                    self.italian_cuisine,
+                )
+                for i in range(3)
+            )
         )
-        restaurant.cuisines.set([self.italian_cuisine])
 
-        url = f"/api/v1/restaurants/{restaurant.id}/"
-        response = self.client.get(url)
+        # Restaurants and prefetched cuisines; cursor pages need no count
+        with self.assertNumQueries(2):
+            response = self.client.get(LIST_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 4)
+
+    def test_list_restaurants_cursor_pages(self):
+        """Test that cursor pages cover same-named restaurants exactly once."""
+        restaurants = self._bulk_create_restaurants(
+            *(
+                ({"place_id": f"place{i}", "name": "Same Name"}, self.italian_cuisine)
+                for i in range(3)
+            )
+        )
+
+        seen = self._walk_pages(LIST_URL)
+
+        expected = sorted(str(r.id) for r in restaurants)
+        self.assertEqual(seen, expected + [str(self.restaurant.id)])
+
+    def test_list_restaurants_cursor_pages_ignore_ordering(self):
+        """Test that an ordering parameter cannot break the cursor pages."""
+        restaurants = self._bulk_create_restaurants(
+            *(
+                (
+                    {
+                        "place_id": f"place{i}",
+                        "name": f"Restaurant {i}",
+                        "rating": rating,
+                    },
+                    self.italian_cuisine,
+                )
+                for i, rating in enumerate([Decimal("4.0"), None, Decimal("4.0")])
+            )
+        )
+
+        seen = self._walk_pages(LIST_URL + "?ordering=-rating")
+
+        expected = [str(r.id) for r in restaurants] + [str(self.restaurant.id)]
+        self.assertEqual(seen, expected)
+
+    def test_retrieve_restaurant(self):
+        """Test retrieving a specific restaurant."""
+        response = self.client.get(self.detail_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["name"], "Test Restaurant")
 
     def test_update_restaurant(self):
         """Test updating a restaurant."""
-        restaurant = Restaurant.objects.create(
-            place_id="ChIJN1t_tDeuEmsRUsoyG83frY4",
-            name="Test Restaurant",
-            address="123 Test Street, Test City",
-            latitude=40.7128,
-            longitude=-74.0060,
-            rating=Decimal("4.5"),
-        )
-        restaurant.cuisines.set([self.italian_cuisine])
-
         updated_data = self.restaurant_data.copy()
         updated_data["name"] = "Updated Restaurant"
 
-        url = f"/api/v1/restaurants/{restaurant.id}/"
-        response = self.client.put(url, updated_data, format="json")
+        response = self.client.put(self.detail_url, updated_data, format="json")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        restaurant.refresh_from_db()
-        self.assertEqual(restaurant.name, "Updated Restaurant")
+        self.restaurant.refresh_from_db(fields=["name"])
+        self.assertEqual(self.restaurant.name, "Updated Restaurant")
+
+    def test_partial_update_writes_only_sent_fields(self):
+        """Test that a partial update writes only the fields it was sent."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(
+                self.detail_url, {"name": "Renamed"}, format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        (update_sql,) = [
+            query["sql"] for query in queries if query["sql"].startswith("UPDATE")
+        ]
+        self.assertIn('"name"', update_sql)
+        self.assertNotIn('"address"', update_sql)
 
     def test_delete_restaurant(self):
         """Test deleting a restaurant."""
-        restaurant = Restaurant.objects.create(
-            place_id="ChIJN1t_tDeuEmsRUsoyG83frY4",
-            name="Test Restaurant",
-            address="123 Test Street, Test City",
-            latitude=40.7128,
-            longitude=-74.0060,
-            rating=Decimal("4.5"),
-        )
-        restaurant.cuisines.set([self.italian_cuisine])
-
-        url = f"/api/v1/restaurants/{restaurant.id}/"
-        response = self.client.delete(url)
+        response = self.client.delete(self.detail_url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
-        self.assertEqual(Restaurant.objects.count(), 0)
+        self.assertFalse(Restaurant.objects.filter(pk=self.restaurant.pk).exists())
 
     def test_filter_by_cuisine(self):
         """Test filtering restaurants by cuisine."""
-        italian_restaurant = Restaurant.objects.create(
-            place_id="place1", name="Italian Restaurant", address="123 Test Street"
+        self._bulk_create_restaurants(
+            (
+                {
+                    "place_id": "place1",
+                    "name": "Italian Restaurant",
+                    "address": "123 Test Street",
+                },
+                self.italian_cuisine,
+            ),
+            (
+                {
+                    "place_id": "place2",
+                    "name": "French Restaurant",
+                    "address": "456 Test Avenue",
+                },
+                self.french_cuisine,
+            ),
         )
-        italian_restaurant.cuisines.set([self.italian_cuisine])
 
-        french_restaurant = Restaurant.objects.create(
-            place_id="place2", name="French Restaurant", address="456 Test Avenue"
+        with self.assertNumQueries(2):
+            response = self.client.get(LIST_URL + "?cuisine=Italian")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["name"], "Italian Restaurant")
+
+    def test_filter_by_cuisine_several_matches(self):
+        """Test that a restaurant matching several cuisines is listed once."""
+        Restaurant.cuisines.through.objects.create(
+            restaurant=self.restaurant, cuisine=self.american_cuisine
         )
-        french_restaurant.cuisines.set([self.french_cuisine])
 
-        url = "/api/v1/restaurants/"
-        response = self.client.get(url + "?cuisine=Italian")
+        response = self.client.get(LIST_URL + "?cuisine=e")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data["results"]), 1)
-        self.assertEqual(response.data["results"][0]["name"], "Italian Restaurant")
 
-    def test_filter_by_name(self):
-        """Test filtering restaurants by name."""
-        pizza_restaurant = Restaurant.objects.create(
-            place_id="place1", name="Pizza Palace", address="123 Test Street"
+    def test_filter_by_rating(self):
+        """Test filtering restaurants by rating range, ignoring bad bounds."""
+        self._bulk_create_restaurants(
+            (
+                {"place_id": "place1", "name": "Low Rated", "rating": Decimal("3.0")},
+                self.italian_cuisine,
+            ),
+        )
+
+        response = self.client.get(LIST_URL + "?rating_min=4&rating_max=abc")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r["name"] for r in response.data["results"]], ["Test Restaurant"]
         )
-        pizza_restaurant.cuisines.set([self.italian_cuisine])
 
-        american_cuisine = Cuisine.objects.create(name="American")
-        burger_restaurant = Restaurant.objects.create(
-            place_id="place2", name="Burger Joint", address="456 Test Avenue"
+    def test_filter_by_name(self):
+        """Test filtering restaurants by name."""
+        self._bulk_create_restaurants(
+            (
+                {
+                    "place_id": "place1",
+                    "name": "Pizza Palace",
+                    "address": "123 Test Street",
+                },
+                self.italian_cuisine,
+            ),
+            (
+                {
+                    "place_id": "place2",
+                    "name": "Burger Joint",
+                    "address": "456 Test Avenue",
+                },
+                self.american_cuisine,
+            ),
         )
-        burger_restaurant.cuisines.set([american_cuisine])
 
-        url = "/api/v1/restaurants/"
-        response = self.client.get(url + "?name=Pizza")
+        response = self.client.get(LIST_URL + "?name=Pizza")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data["results"]), 1)
         self.assertEqual(response.data["results"][0]["name"], "Pizza Palace")
 
     def test_search_restaurants(self):
         """Test searching restaurants."""
-        pizza_restaurant = Restaurant.objects.create(
-            place_id="place1", name="Delicious Pizza", address="123 Pizza Street"
-        )
-        pizza_restaurant.cuisines.set([self.italian_cuisine])
-
-        american_cuisine = Cuisine.objects.create(name="American")
-        burger_restaurant = Restaurant.objects.create(
-            place_id="place2", name="Burger Joint", address="456 Test Avenue"
+        self._bulk_create_restaurants(
+            (
+                {
+                    "place_id": "place1",
+                    "name": "Delicious Pizza",
+                    "address": "123 Pizza Street",
+                },
+                self.italian_cuisine,
+            ),
+            (
+                {
+                    "place_id": "place2",
+                    "name": "Burger Joint",
+                    "address": "456 Test Avenue",
+                },
+                self.american_cuisine,
+            ),
         )
-        burger_restaurant.cuisines.set([american_cuisine])
 
-        url = "/api/v1/restaurants/"
-        response = self.client.get(url + "?search=Pizza")
+        response = self.client.get(LIST_URL + "?search=Pizza")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data["results"]), 1)
 
     def test_unauthenticated_access(self):
         """Test that unauthenticated users cannot access the API."""
-        self.client.credentials()  # Remove authentication
-        url = "/api/v1/restaurants/"
-        response = self.client.get(url)
+        self.client.force_authenticate(user=None)  # Remove authentication
+        response = self.client.get(LIST_URL)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -18,6 +18,9 @@ from apps.restaurants.services.visit_tracking import (
     get_user_cuisine_stats,
     get_user_top_restaurants,
     get_user_top_cuisines,
+    get_user_top_restaurant_names,
+    get_user_top_cuisine_names,
+    get_user_context,
 )
 
 User = get_user_model()
@@ -190,6 +193,29 @@ class TestVisitTrackingService:
         pizza_stat = UserCuisineStat.objects.get(user=user, cuisine=pizza_cuisine)
         assert pizza_stat.visit_count == 1
 
+    @pytest.mark.unit
+    def test_update_visit_stats_mixed_existing_and_new_cuisines(self):
+        """Test that existing cuisine stats increment while missing ones are created."""
+        user = User.objects.create_user(email="test@example.com", password="test123")
+        italian_cuisine = Cuisine.objects.create(name="Italian")
+        pizza_cuisine = Cuisine.objects.create(name="Pizza")
+        restaurant = Restaurant.objects.create(
+            place_id="test123", name="Italian Pizza Restaurant"
+        )
+        restaurant.cuisines.set([italian_cuisine, pizza_cuisine])
+
+        UserCuisineStat.objects.create(
+            user=user, cuisine=italian_cuisine, visit_count=4
+        )
+
+        update_visit_stats(user, restaurant, "2023-01-01")
+
+        italian_stat = UserCuisineStat.objects.get(user=user, cuisine=italian_cuisine)
+        assert italian_stat.visit_count == 5
+
+        pizza_stat = UserCuisineStat.objects.get(user=user, cuisine=pizza_cuisine)
+        assert pizza_stat.visit_count == 1
+
     @pytest.mark.unit
     def test_get_user_restaurant_stats(self):
         """Test getting user restaurant statistics."""
@@ -271,3 +297,82 @@ class TestVisitTrackingService:
         assert len(top_cuisines) == 1
         assert top_cuisines[0][0] == italian_cuisine  # cuisine
         assert top_cuisines[0][1] == 8  # visit_count
+
+    @pytest.mark.unit
+    def test_get_user_top_names(self, django_assert_num_queries):
+        """Test getting top restaurant and cuisine names as plain values."""
+        user = User.objects.create_user(email="test@example.com", password="test123")
+        cuisine = Cuisine.objects.create(name="Italian")
+        restaurant = Restaurant.objects.create(place_id="test1", name="Restaurant 1")
+
+        UserRestaurantVisit.objects.create(
+            user=user, restaurant=restaurant, visit_count=5
+        )
+        UserCuisineStat.objects.create(user=user, cuisine=cuisine, visit_count=8)
+
+        with django_assert_num_queries(2):
+            restaurants = get_user_top_restaurant_names(user, limit=5)
+            cuisines = get_user_top_cuisine_names(user, limit=5)
+
+        assert restaurants == [{"name": "Restaurant 1", "visit_count": 5}]
+        assert cuisines == [{"name": "Italian", "visit_count": 8}]
+
+    @pytest.mark.unit
+    def test_get_user_context_cached_until_next_visit(
+        self, django_assert_num_queries, django_capture_on_commit_callbacks
+    ):
+        """Test that the user context is cached and cleared by a new visit."""
+        user = User.objects.create_user(email="test@example.com", password="test123")
+        restaurant = Restaurant.objects.create(place_id="test1", name="Restaurant 1")
+
+        assert get_user_context(user) == {
+            "frequent_restaurants": [],
+            "preferred_cuisines": [],
+        }
+        with django_assert_num_queries(0):
+            get_user_context(user)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            update_visit_stats(user, restaurant, "2023-01-01")
+
+        assert get_user_context(user)["frequent_restaurants"] == [
+            {"name": "Restaurant 1", "visit_count": 1}
+        ]
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("count", [1, 5, 20])
+    def test_getters_query_count_independent_of_rows(
+        self, django_assert_num_queries, count
+    ):
+        """Test that each stats getter reads related names in one query."""
+        user = User.objects.create_user(email="test@example.com", password="test123")
+        restaurants = Restaurant.objects.bulk_create(
+            [Restaurant(place_id=f"test{i}", name=f"R{i}") for i in range(count)]
+        )
+        cuisines = Cuisine.objects.bulk_create(
+            [Cuisine(name=f"C{i}") for i in range(count)]
+        )
+        UserRestaurantVisit.objects.bulk_create(
+            [UserRestaurantVisit(user=user, restaurant=r) for r in restaurants]
+        )
+        UserCuisineStat.objects.bulk_create(
+            [UserCuisineStat(user=user, cuisine=c) for c in cuisines]
+        )
+
+        with django_assert_num_queries(1):
+            restaurant_names = {
+                v.restaurant.name for v in get_user_restaurant_stats(user)
+            }
+        with django_assert_num_queries(1):
+            cuisine_names = {s.cuisine.name for s in get_user_cuisine_stats(user)}
+        with django_assert_num_queries(1):
+            top_restaurant_names = {
+                r.name for r, _ in get_user_top_restaurants(user, limit=count)
+            }
+        with django_assert_num_queries(1):
+            top_cuisine_names = {
+                c.name for c, _ in get_user_top_cuisines(user, limit=count)
+            }
+
+        assert len(restaurant_names) == len(top_restaurant_names) == count
+        assert len(cuisine_names) == len(top_cuisine_names) == count
@@ -6,16 +6,20 @@ from django.db.models import Q
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
+from .filters import RestaurantFilter
 from .models import Restaurant
+from .pagination import RestaurantCursorPagination
 from .serializers import (
     RestaurantSerializer,
     RestaurantListSerializer,
     RestaurantDetailSerializer,
     RecommendationResponseSerializer,
     AllRecommendationsSerializer,
+    AllRecommendationsParamsSerializer,
+    RecommendationParamsSerializer,
 )
 from .services.recommendations import RestaurantRecommendationService
-from .services.visit_tracking import get_user_top_restaurants, get_user_top_cuisines
+from .services.visit_tracking import get_user_context
 
 
 class RestaurantViewSet(viewsets.ModelViewSet):
@@ -27,49 +31,34 @@ class RestaurantViewSet(viewsets.ModelViewSet):
     queryset = Restaurant.objects.all()
     serializer_class = RestaurantSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = RestaurantCursorPagination
 
-    # Enable filtering and search
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    # Enable filtering and search; there is no OrderingFilter because the
+    # cursor paginator needs its fixed (name, id) ordering to page safely
+    filter_backends = [RestaurantFilter, filters.SearchFilter]
 
     # Fields that can be searched
     search_fields = ["name", "address", "cuisines__name"]
 
-    # Fields that can be used for ordering
-    ordering_fields = ["name", "rating", "updated_at"]
-    ordering = ["name"]  # Default ordering
+    # Service method behind each single-type recommendation endpoint
+    recommendation_methods = {
+        "good": "get_good_restaurants_recommendations",
+        "cheap": "get_cheap_restaurants_recommendations",
+        "cuisine_match": "get_cuisine_match_recommendations",
+    }
 
     def get_queryset(self):
         """
-        Optionally restricts the returned restaurants by filtering against
-        query parameters in the URL.
+        Return restaurants with their cuisines; query parameter filters are
+        applied by RestaurantFilter.
         """
-        queryset = Restaurant.objects.all()
+        # Serializers nest cuisines, so fetch them in one extra query
+        # instead of one per restaurant
+        queryset = Restaurant.objects.prefetch_related("cuisines")
 
-        # Filter by cuisine
-        cuisine = self.request.query_params.get("cuisine")
-        if cuisine is not None:
-            queryset = queryset.filter(cuisines__name__icontains=cuisine)
-
-        # Filter by name
-        name = self.request.query_params.get("name")
-        if name is not None:
-            queryset = queryset.filter(name__icontains=name)
-
-        # Filter by rating range
-        rating_min = self.request.query_params.get("rating_min")
-        rating_max = self.request.query_params.get("rating_max")
-
-        if rating_min is not None:
-            try:
-                queryset = queryset.filter(rating__gte=float(rating_min))
-            except ValueError:
-                pass
-
-        if rating_max is not None:
-            try:
-                queryset = queryset.filter(rating__lte=float(rating_max))
-            except ValueError:
-                pass
+        # The list serializer needs only a few columns
+        if self.action == "list":
+            queryset = queryset.only("id", "place_id", "name", "address", "rating")
 
         return queryset
 
@@ -83,6 +72,49 @@ class RestaurantViewSet(viewsets.ModelViewSet):
             return RestaurantDetailSerializer
         return RestaurantSerializer
 
+    def _recommendations_response(self, request, recommendation_type):
+        """
+        Build the response of a single-type recommendation endpoint.
+        """
+        params = RecommendationParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        try:
+            recommendation_service = RestaurantRecommendationService()
+            get_recommendations = getattr(
+                recommendation_service,
+                self.recommendation_methods[recommendation_type],
+            )
+            recommendations = get_recommendations(
+                user=request.user,
+                limit=params.validated_data["limit"],
+                radius=params.validated_data["radius"],
+                per_location_limit=params.validated_data["search_limit"],
+            )
+
+            # Get user context; only cuisine matches report preferred cuisines
+            user_context = get_user_context(request.user)
+            if recommendation_type != "cuisine_match":
+                user_context = {
+                    "frequent_restaurants": user_context["frequent_restaurants"]
+                }
+
+            response_data = {
+                "recommendation_type": recommendation_type,
+                "count": len(recommendations),
+                "recommendations": recommendations,
+                "user_context": user_context,
+            }
+
+            serializer = RecommendationResponseSerializer(response_data)
+            return Response(serializer.data)
+
+        except Exception as e:
+            return Response(
+                {"error": f"Failed to get recommendations: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
     @swagger_auto_schema(
         method="get",
         operation_summary="Highly-rated recommendations",
@@ -172,6 +204,7 @@ class RestaurantViewSet(viewsets.ModelViewSet):
                     }
                 },
             ),
+            400: openapi.Response(description="Invalid query parameters"),
             500: openapi.Response(description="Failed to get recommendations"),
         },
         tags=["Recommendations"],
@@ -179,43 +212,7 @@ class RestaurantViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["get"], url_path="recommendations/good")
     def good_recommendations(self, request):
         """Get highly-rated restaurant recommendations near user's frequent locations."""
-        try:
-            recommendation_service = RestaurantRecommendationService()
-            radius = int(request.query_params.get("radius", 2000))
-            per_location_limit = int(request.query_params.get("search_limit", 20))
-            recommendations = (
-                recommendation_service.get_good_restaurants_recommendations(
-                    user=request.user,
-                    limit=int(request.query_params.get("limit", 20)),
-                    radius=radius,
-                    per_location_limit=per_location_limit,
-                )
-            )
-
-            # Get user context
-            top_restaurants = get_user_top_restaurants(request.user, limit=5)
-            user_context = {
-                "frequent_restaurants": [
-                    {"name": restaurant.name, "visit_count": visit_count}
-                    for restaurant, visit_count in top_restaurants
-                ]
-            }
-
-            response_data = {
-                "recommendation_type": "good",
-                "count": len(recommendations),
-                "recommendations": recommendations,
-                "user_context": user_context,
-            }
-
-            serializer = RecommendationResponseSerializer(response_data)
-            return Response(serializer.data)
-
-        except Exception as e:
-            return Response(
-                {"error": f"Failed to get recommendations: {str(e)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
+        return self._recommendations_response(request, "good")
 
     @swagger_auto_schema(
         method="get",
@@ -283,6 +280,7 @@ class RestaurantViewSet(viewsets.ModelViewSet):
                     }
                 },
             ),
+            400: openapi.Response(description="Invalid query parameters"),
             500: openapi.Response(description="Failed to get recommendations"),
         },
         tags=["Recommendations"],
@@ -290,43 +288,7 @@ class RestaurantViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["get"], url_path="recommendations/cheap")
     def cheap_recommendations(self, request):
         """Get budget-friendly restaurant recommendations near user's frequent locations."""
-        try:
-            recommendation_service = RestaurantRecommendationService()
-            radius = int(request.query_params.get("radius", 2000))
-            per_location_limit = int(request.query_params.get("search_limit", 20))
-            recommendations = (
-                recommendation_service.get_cheap_restaurants_recommendations(
-                    user=request.user,
-                    limit=int(request.query_params.get("limit", 20)),
-                    radius=radius,
-                    per_location_limit=per_location_limit,
-                )
-            )
-
-            # Get user context
-            top_restaurants = get_user_top_restaurants(request.user, limit=5)
-            user_context = {
-                "frequent_restaurants": [
-                    {"name": restaurant.name, "visit_count": visit_count}
-                    for restaurant, visit_count in top_restaurants
-                ]
-            }
-
-            response_data = {
-                "recommendation_type": "cheap",
-                "count": len(recommendations),
-                "recommendations": recommendations,
-                "user_context": user_context,
-            }
-
-            serializer = RecommendationResponseSerializer(response_data)
-            return Response(serializer.data)
-
-        except Exception as e:
-            return Response(
-                {"error": f"Failed to get recommendations: {str(e)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
+        return self._recommendations_response(request, "cheap")
 
     @swagger_auto_schema(
         method="get",
@@ -394,6 +356,7 @@ class RestaurantViewSet(viewsets.ModelViewSet):
                     }
                 },
             ),
+            400: openapi.Response(description="Invalid query parameters"),
             500: openapi.Response(description="Failed to get recommendations"),
         },
         tags=["Recommendations"],
@@ -401,46 +364,7 @@ class RestaurantViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["get"], url_path="recommendations/cuisine-match")
     def cuisine_match_recommendations(self, request):
         """Get restaurant recommendations matching user's preferred cuisines near frequent locations."""
-        try:
-            recommendation_service = RestaurantRecommendationService()
-            radius = int(request.query_params.get("radius", 2000))
-            per_location_limit = int(request.query_params.get("search_limit", 20))
-            recommendations = recommendation_service.get_cuisine_match_recommendations(
-                user=request.user,
-                limit=int(request.query_params.get("limit", 20)),
-                radius=radius,
-                per_location_limit=per_location_limit,
-            )
-
-            # Get user context
-            top_restaurants = get_user_top_restaurants(request.user, limit=5)
-            top_cuisines = get_user_top_cuisines(request.user, limit=5)
-            user_context = {
-                "frequent_restaurants": [
-                    {"name": restaurant.name, "visit_count": visit_count}
-                    for restaurant, visit_count in top_restaurants
-                ],
-                "preferred_cuisines": [
-                    {"name": cuisine.name, "visit_count": visit_count}
-                    for cuisine, visit_count in top_cuisines
-                ],
-            }
-
-            response_data = {
-                "recommendation_type": "cuisine_match",
-                "count": len(recommendations),
-                "recommendations": recommendations,
-                "user_context": user_context,
-            }
-
-            serializer = RecommendationResponseSerializer(response_data)
-            return Response(serializer.data)
-
-        except Exception as e:
-            return Response(
-                {"error": f"Failed to get recommendations: {str(e)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
+        return self._recommendations_response(request, "cuisine_match")
 
     @swagger_auto_schema(
         method="get",
@@ -530,6 +454,7 @@ class RestaurantViewSet(viewsets.ModelViewSet):
                     }
                 },
             ),
+            400: openapi.Response(description="Invalid query parameters"),
             500: openapi.Response(description="Failed to get recommendations"),
         },
         tags=["Recommendations"],
@@ -537,32 +462,20 @@ class RestaurantViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["get"], url_path="recommendations/all")
     def all_recommendations(self, request):
         """Get all three types of restaurant recommendations."""
+        params = AllRecommendationsParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
         try:
             recommendation_service = RestaurantRecommendationService()
-            limit_per_type = int(request.query_params.get("limit", 10))
-            radius = int(request.query_params.get("radius", 2000))
-            per_location_limit = int(request.query_params.get("search_limit", 20))
-
             all_recommendations = recommendation_service.get_all_recommendations(
                 user=request.user,
-                limit_per_type=limit_per_type,
-                radius=radius,
-                per_location_limit=per_location_limit,
+                limit_per_type=params.validated_data["limit"],
+                radius=params.validated_data["radius"],
+                per_location_limit=params.validated_data["search_limit"],
             )
 
             # Get user context
-            top_restaurants = get_user_top_restaurants(request.user, limit=5)
-            top_cuisines = get_user_top_cuisines(request.user, limit=5)
-            user_context = {
-                "frequent_restaurants": [
-                    {"name": restaurant.name, "visit_count": visit_count}
-                    for restaurant, visit_count in top_restaurants
-                ],
-                "preferred_cuisines": [
-                    {"name": cuisine.name, "visit_count": visit_count}
-                    for cuisine, visit_count in top_cuisines
-                ],
-            }
+            user_context = get_user_context(request.user)
 
             response_data = {**all_recommendations, "user_context": user_context}
 
@@ -0,0 +1,26 @@
+import pytest
+from django.conf import settings
+from django.core.cache import cache
+
+
+def pytest_configure(config):
+    # Test users are throwaway; the default PBKDF2 hasher makes every
+    # create_user() call take tens of milliseconds
+    settings.PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+    # Keep uploaded test images in memory instead of writing them to MEDIA_ROOT
+    settings.STORAGES = {
+        **settings.STORAGES,
+        "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+    }
+
+    # Use a per-process cache so clear_cache() never flushes a shared Redis
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    }
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Start every test with an empty cache so cached Places results don't leak."""
+    cache.clear()
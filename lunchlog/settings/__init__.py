@@ -341,6 +341,16 @@ SIMPLE_JWT = {
     "SLIDING_TOKEN_REFRESH_LIFETIME": timedelta(days=1),
 }
 
+# Cache Configuration
+CACHES = {
+    "default": {
+        "BACKEND": config(
+            "CACHE_BACKEND", default="django.core.cache.backends.redis.RedisCache"
+        ),
+        "LOCATION": config("CACHE_LOCATION", default="redis://redis:6379/1"),
+    }
+}
+
 # Celery Configuration
 CELERY_BROKER_URL = config("CELERY_BROKER_URL", default="redis://redis:6379/0")
 CELERY_RESULT_BACKEND = config("CELERY_RESULT_BACKEND", default="redis://redis:6379/0")
@@ -349,12 +359,31 @@ CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_ENABLE_UTC = True
+# Recycle worker processes periodically so long-lived per-process clients
+# (e.g. the cached Google Places session) are rebuilt
+CELERY_WORKER_MAX_TASKS_PER_CHILD = config(
+    "CELERY_WORKER_MAX_TASKS_PER_CHILD", default=1000, cast=int
+)
 
 # Celery Beat Configuration
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
 
 # Google Places API Configuration
 GOOGLE_PLACES_API_KEY = config("GOOGLE_PLACES_API_KEY", default=None)
+# Maximum Google Places calls in flight across all Celery workers
+GOOGLE_PLACES_MAX_CONCURRENT_CALLS = config(
+    "GOOGLE_PLACES_MAX_CONCURRENT_CALLS", default=10, cast=int
+)
+# Seconds a nearby restaurant search is reused for the same location
+GOOGLE_PLACES_NEARBY_CACHE_TTL = config(
+    "GOOGLE_PLACES_NEARBY_CACHE_TTL", default=3600, cast=int
+)
+
+# Seconds a user's recommendation context (top restaurants and cuisines) is
+# cached; new visits clear it straight away
+RECOMMENDATION_USER_CONTEXT_CACHE_TTL = config(
+    "RECOMMENDATION_USER_CONTEXT_CACHE_TTL", default=300, cast=int
+)
 
 if IS_PROD:
     # # Honor HTTPS from proxy/load balancer
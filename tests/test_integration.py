@@ -30,9 +30,11 @@ def test_complete_user_flow_with_restaurant_creation(
     3. Celery task execution for restaurant info update
     4. Data validation
     """
-    with mock.patch("apps.restaurants.tasks.GooglePlacesService") as MockService:
+    with mock.patch(
+        "apps.restaurants.tasks.get_places_service"
+    ) as mock_get_places_service:
         # Mock the Google Places Service methods
-        mock_service_instance = MockService.return_value
+        mock_service_instance = mock_get_places_service.return_value
         mock_service_instance.fetch_restaurant_details.return_value = (
             mock_google_places_data["place_details"]
         )
@@ -127,7 +129,7 @@ def test_user_can_list_their_receipts(auth_client, test_receipt_data, image_fact
         }
     )
 
-    with mock.patch("apps.restaurants.tasks.GooglePlacesService"):
+    with mock.patch("apps.restaurants.tasks.get_places_service"):
         response = auth_client.post(
             "/api/v1/receipts/", receipt_data_1, format="multipart"
         )
@@ -184,10 +186,13 @@ def test_celery_task_updates_stub_restaurant(db, mock_google_places_data):
         longitude=None,
         rating=None,
     )
+    assert stub_restaurant.is_stub
 
-    with mock.patch("apps.restaurants.tasks.GooglePlacesService") as MockService:
+    with mock.patch(
+        "apps.restaurants.tasks.get_places_service"
+    ) as mock_get_places_service:
         # Mock the Google Places Service methods
-        mock_service_instance = MockService.return_value
+        mock_service_instance = mock_get_places_service.return_value
         mock_service_instance.find_place_from_text.return_value = (
             mock_google_places_data["find_place"]
         )
@@ -201,6 +206,7 @@ def test_celery_task_updates_stub_restaurant(db, mock_google_places_data):
     # Verify restaurant was updated
     stub_restaurant.refresh_from_db()
     assert stub_restaurant.place_id == "ChIJTest123456789"
+    assert not stub_restaurant.is_stub
     assert stub_restaurant.name == "Test Pizza Place"
     assert stub_restaurant.address == "123 Main St, New York, NY 10001, USA"
     assert stub_restaurant.latitude == 40.7128000
@@ -216,8 +222,10 @@ def test_celery_task_handles_api_errors_gracefully(db):
     )
 
     # Mock service to return None (simulating API error)
-    with mock.patch("apps.restaurants.tasks.GooglePlacesService") as MockService:
-        mock_service_instance = MockService.return_value
+    with mock.patch(
+        "apps.restaurants.tasks.get_places_service"
+    ) as mock_get_places_service:
+        mock_service_instance = mock_get_places_service.return_value
         mock_service_instance.fetch_restaurant_details.return_value = None
 
         # Task should not crash, but restaurant should remain unchanged
@@ -278,8 +286,10 @@ def test_celery_scheduled_job_execution(db, mock_google_places_data, celery_eage
     restaurant.refresh_from_db()
 
     # Mock the Google Places service for the scheduled task
-    with mock.patch("apps.restaurants.tasks.GooglePlacesService") as MockService:
-        mock_service_instance = MockService.return_value
+    with mock.patch(
+        "apps.restaurants.tasks.get_places_service"
+    ) as mock_get_places_service:
+        mock_service_instance = mock_get_places_service.return_value
         mock_service_instance.find_place_from_text.return_value = (
             mock_google_places_data["find_place"]
         )